@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "core",
     'rest_framework',
     'rest_framework.authtoken',
@@ -95,6 +96,36 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+
+# Needed whenever more than one process serves the data, the image worker
+# included: a LocMemCache is per process, so what one process writes would
+# not invalidate the responses another has cached.
+REDIS_URL = os.environ.get('REDIS_URL')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+RECIPE_CACHE_ALIAS = 'default'
+RECIPE_CACHE_TIMEOUT = int(os.environ.get('RECIPE_CACHE_TIMEOUT', 300))
+
+# Token lookups of CachedTokenAuthentication: shared between processes,
+# then in a small per-process LRU. Revocations reach other processes once
+# their local entry expires.
+AUTH_TOKEN_CACHE_ALIAS = 'default'
+AUTH_TOKEN_CACHE_TIMEOUT = int(
+    os.environ.get('AUTH_TOKEN_CACHE_TIMEOUT', 300))
+AUTH_TOKEN_LOCAL_CACHE_SIZE = 1024
+AUTH_TOKEN_LOCAL_CACHE_TIMEOUT = 5
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -132,9 +163,24 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/3.2/howto/static-files/
 
 STATIC_URL = "/static/static/"
-MEDIA_URL = "/static/media/"
+# Media is only served to its owners, by recipe.views.RecipeMediaView.
+MEDIA_URL = "/api/recipe/media/"
 
 MEDIA_ROOT = '/vol/web/media'
+# Uploads are stored under their content hash; see core.storage.
+DEFAULT_FILE_STORAGE = 'core.storage.ContentAddressedStorage'
+# Hand authorized media over to the proxy's internal location, which
+# aliases MEDIA_ROOT, instead of streaming it from a worker.
+MEDIA_ACCEL_REDIRECT = bool(int(
+    os.environ.get('MEDIA_ACCEL_REDIRECT', int(not DEBUG))))
+MEDIA_ACCEL_REDIRECT_URL = '/protected-media/'
+
+# Recipe image uploads. The size cap matches client_max_body_size of the
+# proxy; the pixel limits bound what the image worker has to decode.
+RECIPE_IMAGE_MAX_SIZE = int(
+    os.environ.get('RECIPE_IMAGE_MAX_SIZE', 10 * 1024 * 1024))
+RECIPE_IMAGE_MAX_PIXELS = 40_000_000
+RECIPE_IMAGE_MAX_SIDE = 10_000
 STATIC_ROOT = '/vol/web/static'
 
 # Default primary key field type
@@ -146,6 +192,15 @@ AUTH_USER_MODEL = "core.User"
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 SPECTACULAR_SETTINGS = {
@@ -0,0 +1,131 @@
+"""
+Token authentication backed by a per-process LRU and the shared cache
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import (
+    router,
+    transaction,
+)
+from rest_framework.authentication import TokenAuthentication
+
+
+class LocalTokenCache:
+    """Thread-safe LRU of tokens with a time to live, private to a
+    process."""
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, token = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return token
+
+    def set(self, key, token):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.timeout, token)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_tokens = LocalTokenCache(
+    settings.AUTH_TOKEN_LOCAL_CACHE_SIZE,
+    settings.AUTH_TOKEN_LOCAL_CACHE_TIMEOUT,
+)
+
+
+# User columns cached for a token: what requests read from the user, and
+# no credential material such as the password hash.
+CACHED_USER_FIELDS = (
+    'id', 'email', 'name', 'is_active', 'is_staff', 'is_superuser')
+
+
+def get_cache():
+    return caches[settings.AUTH_TOKEN_CACHE_ALIAS]
+
+
+def token_cache_key(key):
+    # Hashed, so the cache never holds a usable credential as a key.
+    return f'auth:token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+def _forget(key):
+    cache_key = token_cache_key(key)
+    local_tokens.delete(cache_key)
+    get_cache().delete(cache_key)
+
+
+def invalidate_token(key):
+    """Drop the cached lookup of token ``key``.
+
+    Forgets now, and again on commit, so a request that raced the commit
+    cannot leave the old token or user cached. Other processes may still
+    accept it from their local cache for AUTH_TOKEN_LOCAL_CACHE_TIMEOUT.
+    """
+    _forget(key)
+    transaction.on_commit(lambda: _forget(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """``TokenAuthentication`` without the ``Token`` JOIN ``User`` query
+    for tokens seen recently.
+
+    Lookups go to the process LRU, then the shared cache, then the
+    database. Only the ``CACHED_USER_FIELDS`` of active users are cached;
+    other columns of the user load on access. Deleting a token or saving
+    its user invalidates it, see ``core.signals``.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        fields = local_tokens.get(cache_key)
+        if fields is None:
+            fields = get_cache().get(cache_key)
+            if fields is None:
+                user, _ = super().authenticate_credentials(key)
+                fields = {name: getattr(user, name)
+                          for name in CACHED_USER_FIELDS}
+                get_cache().set(
+                    cache_key, fields, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+            local_tokens.set(cache_key, fields)
+
+        # Built per request, so views may modify them.
+        user_model = get_user_model()
+        # from_db() takes the values in field order.
+        names = [field.attname for field in user_model._meta.concrete_fields
+                 if field.attname in fields]
+        user = user_model.from_db(
+            router.db_for_read(user_model), names,
+            [fields[name] for name in names])
+        token_model = self.get_model()
+        token = token_model.from_db(
+            router.db_for_read(token_model), ['key', 'user_id'],
+            [key, user.pk])
+        token.user = user
+        return (user, token)
@@ -0,0 +1,130 @@
+"""
+Background generation of resized recipe image variants
+"""
+import io
+import os
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from PIL import (
+    Image,
+    ImageOps,
+)
+
+from core.models import (
+    ImageJob,
+    Recipe,
+)
+
+# Variant name and the longest side it is fitted into, in pixels.
+VARIANTS = (('thumb', 160), ('card', 640), ('full', 1600))
+# Extension, Pillow format and save options of each encoding.
+FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpeg', 'JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+)
+# Failed jobs are retried until they have run this many times.
+MAX_ATTEMPTS = 3
+# Pillow formats accepted as uploads and the extension each is stored
+# (and so served) under, whatever the client named the file.
+UPLOAD_FORMATS = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp'}
+
+
+class ImageRejected(ValueError):
+    pass
+
+
+def read_header(image_file, max_pixels, max_side):
+    """Return the format and size of ``image_file`` as read from its
+    header, rejecting what the worker shouldn't decode.
+
+    ``Image.open`` parses only the header, so a decompression bomb is
+    refused from its declared dimensions before any pixel is decoded.
+    """
+    image_file.seek(0)
+    try:
+        with Image.open(image_file) as image:
+            image_format, size = image.format, image.size
+    except (Image.DecompressionBombError, OSError, SyntaxError) as exc:
+        raise ImageRejected(f'Not a readable image: {exc}')
+    finally:
+        image_file.seek(0)
+    if image_format not in UPLOAD_FORMATS:
+        raise ImageRejected(f'Unsupported image format {image_format}.')
+    width, height = size
+    if max(width, height) > max_side or width * height > max_pixels:
+        raise ImageRejected(
+            f'{width}x{height} image exceeds the {max_side} pixel side '
+            f'or {max_pixels} pixel limit.')
+    return image_format, size
+
+
+def render_variants(image_file):
+    """Write every variant of ``image_file`` next to it in its storage and
+    return the variant map stored in ``Recipe.image_variants``.
+
+    The output is upright (EXIF orientation applied) and carries no
+    metadata: nothing from ``info`` is passed on to the encoders.
+    """
+    storage = image_file.storage
+    stem = os.path.splitext(image_file.name)[0]
+    largest = max(size for _, size in VARIANTS)
+    with image_file.open('rb'), Image.open(image_file) as original:
+        # JPEGs can be decoded at a reduced scale, much faster than full.
+        original.draft('RGB', (largest, largest))
+        upright = ImageOps.exif_transpose(original)
+        if upright.mode != 'RGB':
+            upright = upright.convert('RGB')
+
+    variants = {}
+    for name, size in VARIANTS:
+        resized = upright.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        resized.info.clear()
+        variants[name] = {}
+        for ext, image_format, options in FORMATS:
+            buffer = io.BytesIO()
+            resized.save(buffer, image_format, **options)
+            variants[name][ext] = storage.save(
+                f'{stem}-{name}.{ext}', ContentFile(buffer.getvalue()))
+    return variants
+
+
+def process_job(job):
+    """Render the variants of ``job.image`` onto its recipe, unless a newer
+    upload replaced it or the recipe was deleted meanwhile."""
+    try:
+        recipe = job.recipe
+        if recipe.image.name != job.image:
+            return
+        variants = render_variants(recipe.image)
+        with transaction.atomic():
+            recipe = Recipe.objects.select_for_update().get(pk=recipe.pk)
+            if recipe.image.name != job.image:
+                # Unreferenced, so left for gc_media: another recipe may
+                # share the files.
+                return
+            recipe.image_variants = variants
+            recipe.save(update_fields=['image_variants', 'updated_at'])
+    except Recipe.DoesNotExist:
+        # Its variants, if rendered, are left for gc_media likewise.
+        pass
+
+
+def run_jobs(limit):
+    """Claim and process up to ``limit`` jobs; returns how many ran."""
+    jobs = ImageJob.objects.claim(limit)
+    for job in jobs:
+        try:
+            process_job(job)
+        except Exception as exc:
+            status = (ImageJob.FAILED if job.attempts >= MAX_ATTEMPTS
+                      else ImageJob.PENDING)
+            error = f'{type(exc).__name__}: {exc}'
+        else:
+            status, error = ImageJob.DONE, ''
+        # A no-op when the job went with its recipe.
+        ImageJob.objects.filter(pk=job.pk).update(
+            status=status, error=error, updated_at=timezone.now())
+    return len(jobs)
@@ -0,0 +1,79 @@
+"""
+Django command timing tag autocomplete lookups on a large vocabulary
+"""
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import (
+    connection,
+    transaction,
+)
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import Tag
+from recipe.filters import NameLookupFilter
+
+SYLLABLES = [
+    'ba', 'co', 'di', 'fe', 'ga', 'hu', 'ki', 'lo', 'ma', 'ne',
+    'pi', 'ro', 'sa', 'te', 'vu', 'za', 'ch', 'sh', 'qu', 'tr',
+]
+
+
+def sample_names(count, rng):
+    names = set()
+    while len(names) < count:
+        names.add(' '.join(
+            ''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))
+            for _ in range(rng.randint(1, 3))
+        ))
+    return sorted(names)
+
+
+class Command(BaseCommand):
+    help = ('Time prefix and fuzzy tag lookups for one user with a large '
+            'vocabulary; the data is rolled back afterwards')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--names', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def timed(self, user, params):
+        request = Request(APIRequestFactory().get('/', params))
+        queryset = Tag.objects.filter(user=user).values('id', 'name')
+        start = time.perf_counter()
+        list(NameLookupFilter().filter_queryset(request, queryset, None))
+        return (time.perf_counter() - start) * 1000
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        names = sample_names(options['names'], rng)
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                'benchmark-autocomplete@example.com', None)
+            Tag.objects.bulk_create(
+                (Tag(user=user, name=name) for name in names),
+                batch_size=5000,
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {Tag._meta.db_table}')
+            self.stdout.write(
+                f"{len(names)} names, {options['repeat']} lookups each")
+
+            for label, make_params in (
+                    ('prefix', lambda name: {'prefix': name[:3]}),
+                    ('q', lambda name: {'q': name.split()[0][:-1]})):
+                timings = sorted(
+                    self.timed(user, make_params(rng.choice(names)))
+                    for _ in range(options['repeat'])
+                )
+                p95 = timings[int(len(timings) * 0.95) - 1]
+                self.stdout.write(
+                    f'{label}: median {statistics.median(timings):.2f} ms, '
+                    f'p95 {p95:.2f} ms'
+                )
+            transaction.set_rollback(True)
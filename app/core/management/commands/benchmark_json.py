@@ -0,0 +1,64 @@
+"""
+Django command comparing the stdlib and orjson based JSON renderer/parser
+"""
+import io
+import timeit
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer
+
+
+def sample_recipes(count):
+    """A recipe list shaped like the output of ``RecipeSerializer``."""
+    return [
+        OrderedDict([
+            ('id', i),
+            ('title', f'Recipe {i}'),
+            ('time_minutes', 10 + i % 50),
+            ('price', Decimal(f'{i % 100}.{i % 100:02d}')),
+            ('link', f'https://example.com/recipes/{i}'),
+            ('tags', [OrderedDict([('id', j), ('name', f'Tag {j}')])
+                      for j in range(3)]),
+            ('ingredients', [
+                OrderedDict([('id', j), ('name', f'Ingredient {j}')])
+                for j in range(8)
+            ]),
+        ])
+        for i in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Time rendering and parsing a recipe list with each JSON backend'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        data = sample_recipes(options['recipes'])
+        body = JSONRenderer().render(data)
+        self.stdout.write(
+            f"{options['recipes']} recipes, {len(body)} bytes, "
+            f"best of {options['repeat']} runs"
+        )
+
+        for label, renderer, parser in (
+                ('stdlib', JSONRenderer(), JSONParser()),
+                ('orjson', ORJSONRenderer(), ORJSONParser())):
+            render = min(timeit.repeat(
+                lambda: renderer.render(data),
+                number=1, repeat=options['repeat']))
+            parse = min(timeit.repeat(
+                lambda: parser.parse(io.BytesIO(body)),
+                number=1, repeat=options['repeat']))
+            self.stdout.write(
+                f'{label}: render {render * 1000:.2f} ms, '
+                f'parse {parse * 1000:.2f} ms'
+            )
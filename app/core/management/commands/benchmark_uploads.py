@@ -0,0 +1,169 @@
+"""
+Django command measuring the memory and time the image upload endpoint
+takes under concurrent multipart uploads
+"""
+import io
+import multiprocessing
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from http.client import HTTPConnection
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.servers.basehttp import (
+    ThreadedWSGIServer,
+    WSGIRequestHandler,
+)
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.test import override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from core.models import Recipe
+
+
+def sample_jpeg(width, height):
+    """A noisy photo-sized JPEG, which compresses about like a real one."""
+    buffer = io.BytesIO()
+    Image.effect_noise((width, height), 48).convert('RGB').save(
+        buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def multipart_body(content):
+    boundary = uuid.uuid4().hex
+    body = b''.join([
+        f'--{boundary}\r\n'.encode(),
+        b'Content-Disposition: form-data; name="image"; '
+        b'filename="photo.jpg"\r\n',
+        b'Content-Type: image/jpeg\r\n\r\n',
+        content,
+        f'\r\n--{boundary}--\r\n'.encode(),
+    ])
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+def peak_rss():
+    """Peak resident set size of this process in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class BenchmarkServer(ThreadedWSGIServer):
+    # Room for every client to connect at once.
+    request_queue_size = 1024
+
+
+def serve(conn, media_root):
+    """Serve the project in this (forked) process until the parent asks
+    for the peak RSS growth since it started measuring."""
+    with override_settings(MEDIA_ROOT=media_root,
+                           ALLOWED_HOSTS=['127.0.0.1']):
+        server = BenchmarkServer(
+            ('127.0.0.1', 0), QuietRequestHandler, allow_reuse_address=False)
+        server.set_app(get_wsgi_application())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        conn.send(server.server_port)
+        conn.recv()
+        baseline = peak_rss()
+        conn.send(baseline)
+        conn.recv()
+        conn.send(peak_rss() - baseline)
+        server.shutdown()
+
+
+class Command(BaseCommand):
+    help = ('Measure the peak RSS growth and time of a server process '
+            'taking concurrent uploads to the recipe upload-image endpoint; '
+            'the data is deleted afterwards')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--width', type=int, default=1200)
+        parser.add_argument('--height', type=int, default=900)
+        parser.add_argument('--concurrency', type=int, default=8)
+
+    def upload(self, port, url, token, body, content_type):
+        client = HTTPConnection('127.0.0.1', port)
+        try:
+            client.request('POST', url, body, {
+                'Authorization': f'Token {token}',
+                'Content-Type': content_type,
+            })
+            response = client.getresponse()
+            response.read()
+            return response.status
+        finally:
+            client.close()
+
+    def handle(self, *args, **options):
+        content = sample_jpeg(options['width'], options['height'])
+        concurrency = options['concurrency']
+        self.stdout.write(
+            f'{concurrency} concurrent uploads of {len(content)} bytes '
+            f"({options['width']}x{options['height']})")
+
+        user = get_user_model().objects.create_user(
+            f'benchmark-uploads-{uuid.uuid4().hex}@example.com', None)
+        media_root = tempfile.mkdtemp()
+        server = None
+        try:
+            token = Token.objects.create(user=user).key
+            recipes = Recipe.objects.bulk_create(
+                Recipe(user=user, title=f'Upload {i}', time_minutes=1,
+                       price=Decimal('1.00'))
+                for i in range(concurrency + 1)
+            )
+            urls = [reverse('recipe:recipe-upload-image', args=[recipe.pk])
+                    for recipe in recipes]
+            body, content_type = multipart_body(content)
+
+            # The server forks with no connection of ours to share.
+            connections.close_all()
+            conn, child_conn = multiprocessing.Pipe()
+            server = multiprocessing.get_context('fork').Process(
+                target=serve, args=(child_conn, media_root), daemon=True)
+            server.start()
+            port = conn.recv()
+
+            # Warm up imports and connections before measuring.
+            warm_up = self.upload(
+                port, urls[-1], token, body, content_type)
+            conn.send('measure')
+            baseline = conn.recv()
+            start = time.perf_counter()
+            with ThreadPoolExecutor(concurrency) as pool:
+                statuses = list(pool.map(
+                    lambda url: self.upload(
+                        port, url, token, body, content_type),
+                    urls[:concurrency]))
+            elapsed = time.perf_counter() - start
+            conn.send('report')
+            growth = conn.recv()
+        finally:
+            if server is not None:
+                server.join(timeout=5)
+                if server.is_alive():
+                    server.kill()
+            user.delete()
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        self.stdout.write(
+            f'statuses: {sorted(set(statuses + [warm_up]))}; server '
+            f'peak RSS {baseline / 2 ** 20:.1f} MiB after warm-up, '
+            f'+{growth / 2 ** 20:.2f} MiB under load, '
+            f'{elapsed * 1000:.1f} ms')
@@ -0,0 +1,57 @@
+"""
+Django command deleting stored media files nothing refers to
+"""
+import os
+import time
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import MediaFile
+
+
+class Command(BaseCommand):
+    help = ('Delete media files without references: replaced and deleted '
+            'recipe images, their variants and abandoned uploads')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=3600,
+            help='Keep files written or reused within this many seconds, '
+                 'whose references may not be committed yet')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report what would be deleted')
+
+    def handle(self, *args, **options):
+        cutoff = time.time() - options['grace']
+        referenced = set(MediaFile.objects.filter(
+            ref_count__gt=0).values_list('name', flat=True).iterator())
+
+        deleted = freed = 0
+        root = default_storage.location
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, root).replace(os.sep, '/')
+                if name in referenced:
+                    continue
+                stat = os.stat(path)
+                if stat.st_mtime >= cutoff:
+                    continue
+                if not options['dry_run']:
+                    os.unlink(path)
+                deleted += 1
+                freed += stat.st_size
+
+        if not options['dry_run']:
+            MediaFile.objects.filter(
+                ref_count__lte=0,
+                updated_at__lt=timezone.now() - timedelta(
+                    seconds=options['grace']),
+            ).delete()
+        self.stdout.write(
+            f'{deleted} file(s), {freed} bytes '
+            f'{"to delete" if options["dry_run"] else "deleted"}')
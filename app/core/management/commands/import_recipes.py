@@ -0,0 +1,50 @@
+"""
+Django command to bulk import recipes from an NDJSON or CSV file
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+
+from recipe import importer
+
+
+class Command(BaseCommand):
+    help = 'Import recipes for a user from a file in the export layout'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--email', required=True)
+        parser.add_argument('--format', choices=importer.FORMATS)
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user with email {options['email']}")
+        file_format = options['format'] or (
+            'csv' if options['path'].lower().endswith('.csv') else 'ndjson')
+
+        start = time.monotonic()
+
+        def progress(created):
+            elapsed = time.monotonic() - start
+            self.stdout.write(
+                f'{created} recipes imported ({created / elapsed:.0f}/s)')
+
+        recipe_importer = importer.RecipeImporter(
+            user, chunk_size=options['chunk_size'], progress=progress)
+        with open(options['path'], 'rb') as stream:
+            try:
+                created = recipe_importer.run(
+                    importer.PARSERS[file_format](stream))
+            except importer.RecipeImportError as exc:
+                raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {created} recipes in {time.monotonic() - start:.1f}s'
+        ))
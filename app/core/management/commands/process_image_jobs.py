@@ -0,0 +1,39 @@
+"""
+Django command running the recipe image variant worker
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from core import images
+from core.models import ImageJob
+
+
+class Command(BaseCommand):
+    help = 'Generate image variants for queued uploads'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once the queue is empty instead of polling')
+        parser.add_argument('--batch-size', type=int, default=10)
+        parser.add_argument(
+            '--interval', type=float, default=2.0,
+            help='Seconds to wait between polls of an empty queue')
+        parser.add_argument(
+            '--stale-after', type=int, default=600,
+            help='Requeue jobs left running this many seconds')
+
+    def handle(self, *args, **options):
+        stale_after = timedelta(seconds=options['stale_after'])
+        processed = 0
+        while True:
+            ImageJob.objects.requeue_stale(stale_after)
+            ran = images.run_jobs(options['batch_size'])
+            processed += ran
+            if not ran:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        self.stdout.write(f'{processed} job(s) processed')
@@ -0,0 +1,20 @@
+"""
+Django command repairing drifted tag and ingredient recipe counters
+"""
+from django.core.management.base import BaseCommand
+
+from core.models import (
+    Tag,
+    Ingredient,
+)
+
+
+class Command(BaseCommand):
+    help = ('Recompute recipe_count of tags and ingredients from the '
+            'recipe links, fixing any that drifted')
+
+    def handle(self, *args, **options):
+        for model in (Tag, Ingredient):
+            fixed = model.objects.recount()
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: {fixed} fixed')
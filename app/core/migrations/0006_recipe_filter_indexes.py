@@ -0,0 +1,31 @@
+# Generated by Django 4.0.10 on 2026-10-17 05:58
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0005_recipe_image'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='recipe',
+            index=models.Index(fields=['user', '-id'], name='recipe_user_id_desc_idx'),
+        ),
+        # The auto-created M2M tables only index (recipe_id, <attr>_id);
+        # the EXISTS filters probe them by attribute first.
+        migrations.RunSQL(
+            sql='CREATE INDEX CONCURRENTLY IF NOT EXISTS core_recipe_tags_tag_recipe_idx '
+                'ON core_recipe_tags (tag_id, recipe_id);',
+            reverse_sql='DROP INDEX CONCURRENTLY IF EXISTS core_recipe_tags_tag_recipe_idx;',
+        ),
+        migrations.RunSQL(
+            sql='CREATE INDEX CONCURRENTLY IF NOT EXISTS core_recipe_ingredients_ingredient_recipe_idx '
+                'ON core_recipe_ingredients (ingredient_id, recipe_id);',
+            reverse_sql='DROP INDEX CONCURRENTLY IF EXISTS core_recipe_ingredients_ingredient_recipe_idx;',
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.0.10 on 2026-10-17 05:59
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """Fold same-named tags/ingredients of a user into the oldest row."""
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, field in (('Tag', 'tags'), ('Ingredient', 'ingredients')):
+        model = apps.get_model('core', model_name)
+        through = getattr(Recipe, field).through
+        column = f'{model_name.lower()}_id'
+        duplicates = (
+            model.objects.values('user_id', 'name')
+            .annotate(keep_id=Min('id'), copies=Count('id'))
+            .filter(copies__gt=1)
+        )
+        for row in duplicates:
+            others = model.objects.filter(
+                user_id=row['user_id'], name=row['name'],
+            ).exclude(id=row['keep_id'])
+            linked = set(
+                through.objects.filter(**{column: row['keep_id']})
+                .values_list('recipe_id', flat=True)
+            )
+            relink = set(
+                through.objects.filter(**{f'{column}__in': others})
+                .values_list('recipe_id', flat=True)
+            ) - linked
+            through.objects.bulk_create([
+                through(recipe_id=recipe_id, **{column: row['keep_id']})
+                for recipe_id in relink
+            ])
+            others.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_recipe_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+    ]
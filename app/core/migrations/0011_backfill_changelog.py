@@ -0,0 +1,25 @@
+from django.db import migrations
+
+# Existing rows predate the log; seed one upsert each so a client syncing
+# from token 0 receives the whole collection.
+BACKFILL_SQL = [
+    f"""
+    INSERT INTO core_changelog
+        (user_id, object_type, object_id, action, created_at)
+    SELECT user_id, '{object_type}', id, 'upsert', NOW()
+    FROM core_{object_type}
+    ORDER BY id
+    """
+    for object_type in ('tag', 'ingredient', 'recipe')
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_changelog'),
+    ]
+
+    operations = [
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.0.10 on 2026-10-17 06:38
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+# Same document as RecipeQuerySet.update_search_vector, for existing rows.
+BACKFILL_SQL = """
+UPDATE core_recipe AS r SET search_vector =
+    setweight(to_tsvector('english', COALESCE(r.title, '')), 'A')
+    || setweight(to_tsvector('english', COALESCE((
+        SELECT string_agg(t.name, ' ')
+        FROM core_recipe_tags rt JOIN core_tag t ON t.id = rt.tag_id
+        WHERE rt.recipe_id = r.id), '')), 'B')
+    || setweight(to_tsvector('english', COALESCE((
+        SELECT string_agg(i.name, ' ')
+        FROM core_recipe_ingredients ri
+        JOIN core_ingredient i ON i.id = ri.ingredient_id
+        WHERE ri.recipe_id = r.id), '')), 'B')
+    || setweight(to_tsvector('english', COALESCE(r.description, '')), 'C')
+"""
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0011_backfill_changelog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+        AddIndexConcurrently(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipe_search_vector_idx'),
+        ),
+    ]
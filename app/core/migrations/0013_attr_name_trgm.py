@@ -0,0 +1,30 @@
+# Generated by Django 4.0.10 on 2026-10-17 06:49
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import (
+    AddIndexConcurrently,
+    BtreeGinExtension,
+    TrigramExtension,
+)
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0012_recipe_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        BtreeGinExtension(),
+        AddIndexConcurrently(
+            model_name='ingredient',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['user', 'name'], name='ingredient_user_name_trgm_idx', opclasses=['int8_ops', 'gin_trgm_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='tag',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['user', 'name'], name='tag_user_name_trgm_idx', opclasses=['int8_ops', 'gin_trgm_ops']),
+        ),
+    ]
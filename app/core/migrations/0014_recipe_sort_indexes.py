@@ -0,0 +1,23 @@
+# Generated by Django 4.0.10 on 2026-10-17 06:53
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0013_attr_name_trgm'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'price'], name='recipe_user_price_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'time_minutes'], name='recipe_user_time_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.0.10 on 2026-10-17 07:03
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+BACKFILL_SQL = [
+    f"""
+    UPDATE core_{attr} a SET recipe_count = (
+        SELECT COUNT(*) FROM core_recipe_{attr}s l WHERE l.{attr}_id = a.id
+    )
+    """
+    for attr in ('tag', 'ingredient')
+]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0014_recipe_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+        AddIndexConcurrently(
+            model_name='ingredient',
+            index=models.Index(fields=['user', '-recipe_count'], name='ingredient_user_count_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='tag',
+            index=models.Index(fields=['user', '-recipe_count'], name='tag_user_count_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.0.10 on 2026-10-17 07:15
+
+from django.db import migrations, models
+
+# Files recipes already point at, so gc_media doesn't collect them.
+BACKFILL_SQL = """
+INSERT INTO core_mediafile (name, ref_count, updated_at)
+SELECT name, COUNT(*), NOW() FROM (
+    SELECT image AS name FROM core_recipe
+    WHERE image IS NOT NULL AND image <> ''
+    UNION ALL
+    SELECT f.value FROM core_recipe r,
+        jsonb_each(r.image_variants) v, jsonb_each_text(v.value) f
+) refs
+GROUP BY name
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_image_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('ref_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
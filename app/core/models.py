@@ -2,20 +2,58 @@ import uuid
 import os
 
 from django.conf import settings
-from django.db import models  # noqa
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import (
+    SearchVector,
+    SearchVectorField,
+)
+from django.db import (  # noqa
+    connections,
+    models,
+    transaction,
+)
+from django.db.models import (
+    Count,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin,
 )
 
+# First key of the advisory lock serializing a user's change log writers.
+CHANGE_LOG_LOCK = 0x636c6f67
+# Text search configuration of Recipe.search_vector and the search filter.
+SEARCH_CONFIG = 'english'
+
 
 def recipe_image_file_path(instance, filename):
+    # Only the directory and extension survive ContentAddressedStorage.
     ext = os.path.splitext(filename)[1]
     filename = f'{uuid.uuid4()}{ext}'
     return os.path.join('uploads', 'recipe', filename)
 
 
+# Recipe fields naming stored media files.
+RECIPE_MEDIA_FIELDS = {'image', 'image_variants'}
+
+
+def recipe_media_names(image, image_variants):
+    """Storage names of the media files a recipe refers to."""
+    names = {name for formats in image_variants.values()
+             for name in formats.values()}
+    if image:
+        names.add(str(image))
+    return names
+
+
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
         if not email:
@@ -44,6 +82,32 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = "email"
 
 
+class RecipeQuerySet(models.QuerySet):
+    def _attr_names(self, field):
+        through = getattr(self.model, field).through
+        attr = self.model._meta.get_field(field).m2m_reverse_field_name()
+        return Subquery(
+            through.objects.filter(recipe_id=OuterRef('pk'))
+            .values('recipe_id')
+            .annotate(names=StringAgg(f'{attr}__name', ' '))
+            .values('names')
+        )
+
+    def update_search_vector(self, **fields):
+        """Recompute ``search_vector`` of the recipes in this queryset from
+        their title, tag and ingredient names and description, setting
+        ``fields`` in the same UPDATE."""
+        return self.update(**fields, search_vector=(
+            SearchVector('title', weight='A', config=SEARCH_CONFIG)
+            + SearchVector(
+                self._attr_names('tags'), weight='B', config=SEARCH_CONFIG)
+            + SearchVector(
+                self._attr_names('ingredients'),
+                weight='B', config=SEARCH_CONFIG)
+            + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+        ))
+
+
 class Recipe(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -57,17 +121,94 @@ class Recipe(models.Model):
     tags = models.ManyToManyField('Tag')
     ingredients = models.ManyToManyField('Ingredient')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    # Variant name -> format -> storage name, filled in by core.images.
+    image_variants = models.JSONField(default=dict, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Maintained by core.signals; see RecipeQuerySet.update_search_vector.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-id'],
+                name='recipe_user_id_desc_idx',
+            ),
+            models.Index(
+                fields=['user', 'price'],
+                name='recipe_user_price_idx',
+            ),
+            models.Index(
+                fields=['user', 'time_minutes'],
+                name='recipe_user_time_idx',
+            ),
+            GinIndex(
+                fields=['search_vector'],
+                name='recipe_search_vector_idx',
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.title
 
 
+class RecipeAttrQuerySet(models.QuerySet):
+    def adjust_recipe_count(self, deltas):
+        """Add ``deltas`` (a mapping of pk to change) to ``recipe_count``,
+        with one atomic ``F()`` UPDATE per distinct change."""
+        ids_by_delta = {}
+        for pk, delta in deltas.items():
+            if delta:
+                ids_by_delta.setdefault(delta, []).append(pk)
+        for delta, ids in ids_by_delta.items():
+            self.filter(pk__in=ids).update(
+                recipe_count=F('recipe_count') + delta)
+
+    def recount(self):
+        """Reset drifted ``recipe_count`` values from the through table;
+        returns how many rows were off."""
+        relation = self.model._meta.get_field('recipe')
+        column = f'{self.model._meta.model_name}_id'
+        actual = Coalesce(Subquery(
+            relation.through.objects.filter(**{column: OuterRef('pk')})
+            .values(column).annotate(count=Count('*')).values('count')
+        ), 0)
+        return self.annotate(actual=actual).exclude(
+            recipe_count=F('actual')).update(recipe_count=actual)
+
+
 class Tag(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True)
+    # Number of recipes using it, maintained by core.signals.
+    recipe_count = models.IntegerField(default=0, editable=False)
+
+    objects = RecipeAttrQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='unique_tag_name_per_user',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-recipe_count'],
+                name='tag_user_count_idx',
+            ),
+            # btree_gin + pg_trgm: per user prefix and fuzzy name lookups.
+            GinIndex(
+                fields=['user', 'name'],
+                name='tag_user_name_trgm_idx',
+                opclasses=['int8_ops', 'gin_trgm_ops'],
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -79,6 +220,207 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True)
+    # Number of recipes using it, maintained by core.signals.
+    recipe_count = models.IntegerField(default=0, editable=False)
+
+    objects = RecipeAttrQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='unique_ingredient_name_per_user',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-recipe_count'],
+                name='ingredient_user_count_idx',
+            ),
+            # btree_gin + pg_trgm: per user prefix and fuzzy name lookups.
+            GinIndex(
+                fields=['user', 'name'],
+                name='ingredient_user_name_trgm_idx',
+                opclasses=['int8_ops', 'gin_trgm_ops'],
+            ),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class ChangeLogManager(models.Manager):
+    def log(self, user_id, object_type, object_ids, action):
+        """Append one entry per id in ``object_ids``.
+
+        Writers of one user are serialized with a transaction level advisory
+        lock, so entry ids of a user are allocated in commit order and a
+        reader holding token ``n`` can never later see a new entry below it.
+        """
+        if not object_ids:
+            return
+        with transaction.atomic(using=self.db), \
+                connections[self.db].cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_advisory_xact_lock(%s, %s)',
+                [CHANGE_LOG_LOCK, user_id],
+            )
+            # One statement for any number of ids; imports log thousands.
+            cursor.execute(
+                f'INSERT INTO {self.model._meta.db_table} '
+                '(user_id, object_type, object_id, action, created_at) '
+                'SELECT %s, %s, object_id, %s, NOW() '
+                'FROM unnest(%s::bigint[]) WITH ORDINALITY '
+                'AS ids(object_id, position) ORDER BY position',
+                [user_id, object_type, action, list(object_ids)],
+            )
+
+
+class ChangeLog(models.Model):
+    """Append-only log of writes to a user's recipes, tags and ingredients.
+
+    The ``id`` is the change token handed to sync clients.
+    """
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    ACTION_CHOICES = [(UPSERT, 'Upsert'), (DELETE, 'Delete')]
+    OBJECT_TYPE_CHOICES = [
+        ('recipe', 'Recipe'),
+        ('tag', 'Tag'),
+        ('ingredient', 'Ingredient'),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    object_type = models.CharField(max_length=20, choices=OBJECT_TYPE_CHOICES)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ChangeLogManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'id'],
+                name='changelog_user_id_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.action} {self.object_type} {self.object_id}'
+
+
+class ImageJobQuerySet(models.QuerySet):
+    def claim(self, limit):
+        """Mark up to ``limit`` pending jobs running and return them.
+
+        SKIP LOCKED lets several workers poll the table without handing
+        out the same job twice.
+        """
+        with transaction.atomic(using=self.db):
+            jobs = list(
+                self.select_for_update(skip_locked=True)
+                .filter(status=ImageJob.PENDING).order_by('id')[:limit]
+            )
+            self.filter(pk__in=[job.pk for job in jobs]).update(
+                status=ImageJob.RUNNING,
+                attempts=F('attempts') + 1,
+                updated_at=timezone.now(),
+            )
+        for job in jobs:
+            job.status = ImageJob.RUNNING
+            job.attempts += 1
+        return jobs
+
+    def requeue_stale(self, older_than):
+        """Put back jobs whose worker died ``older_than`` into running."""
+        return self.filter(
+            status=ImageJob.RUNNING,
+            updated_at__lt=timezone.now() - older_than,
+        ).update(status=ImageJob.PENDING, updated_at=timezone.now())
+
+
+class ImageJob(models.Model):
+    """Queued generation of the image variants of a recipe."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='image_jobs',
+    )
+    # Storage name of the upload to process; a newer upload supersedes it.
+    image = models.CharField(max_length=255)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ImageJobQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['id'],
+                name='imagejob_pending_idx',
+                condition=Q(status='pending'),
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.status} {self.image}'
+
+
+class MediaFileManager(models.Manager):
+    def adjust(self, deltas):
+        """Add ``deltas``, a mapping of storage name to change, to the
+        reference counts in one statement, creating missing rows."""
+        deltas = {name: delta for name, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        table = self.model._meta.db_table
+        names = sorted(deltas)
+        with connections[self.db].cursor() as cursor:
+            # Rows are locked in name order, so concurrent calls can't
+            # deadlock on each other.
+            cursor.execute(
+                f'INSERT INTO {table} (name, ref_count, updated_at) '
+                'SELECT name, delta, NOW() '
+                'FROM unnest(%s::text[], %s::int[]) AS t(name, delta) '
+                'ORDER BY name '
+                'ON CONFLICT (name) DO UPDATE SET '
+                f'ref_count = {table}.ref_count + EXCLUDED.ref_count, '
+                'updated_at = EXCLUDED.updated_at',
+                [names, [deltas[name] for name in names]],
+            )
+
+
+class MediaFile(models.Model):
+    """Reference count of a stored media file, by storage name.
+
+    Content-addressed names are shared by every recipe holding the same
+    bytes; ``gc_media`` deletes the files nothing refers to anymore.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    ref_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = MediaFileManager()
+
+    def __str__(self):
+        return f'{self.name} ({self.ref_count})'
@@ -0,0 +1,33 @@
+"""
+orjson based renderer for the REST API
+"""
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+LINE_SEPARATOR = '\u2028'.encode()
+PARAGRAPH_SEPARATOR = '\u2029'.encode()
+
+
+class ORJSONRenderer(JSONRenderer):
+    """Drop-in replacement for ``JSONRenderer`` built on orjson.
+
+    Types orjson does not know (Decimal, lazy strings, sets, ...) and
+    datetimes go through DRF's encoder, so the output matches
+    ``JSONRenderer``. Indented, ASCII-only or non-compact output is left to
+    ``JSONRenderer``.
+    """
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(
+            data, default=self.encoder_class().default, option=self.options)
+        # Same strict javascript subset guarantee as JSONRenderer.
+        return ret.replace(LINE_SEPARATOR, b'\\u2028').replace(
+            PARAGRAPH_SEPARATOR, b'\\u2029')
@@ -0,0 +1,253 @@
+"""
+Model layer signal handlers: updated_at bumps, search vectors, recipe
+counters, media reference counts, the token cache and the change log
+"""
+from collections import Counter
+from threading import local
+
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.contrib.auth import get_user_model
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from core.authentication import invalidate_token
+from core.models import (
+    RECIPE_MEDIA_FIELDS,
+    ChangeLog,
+    MediaFile,
+    Recipe,
+    Tag,
+    Ingredient,
+    recipe_media_names,
+)
+
+
+# Users this thread is deleting. Their change log goes with them, so the
+# rows cascading from them log nothing; an entry would point at a user
+# missing by commit time.
+_deleted_users = local()
+
+
+def _deleting(user_id):
+    return user_id in getattr(_deleted_users, 'ids', ())
+
+
+@receiver(pre_delete, sender=get_user_model())
+def mark_deleted_user(sender, instance, **kwargs):
+    if not hasattr(_deleted_users, 'ids'):
+        _deleted_users.ids = set()
+    _deleted_users.ids.add(instance.pk)
+
+
+@receiver(post_delete, sender=get_user_model())
+def unmark_deleted_user(sender, instance, **kwargs):
+    getattr(_deleted_users, 'ids', set()).discard(instance.pk)
+
+
+def _log_change(user_id, object_type, object_ids, action):
+    if not _deleting(user_id):
+        ChangeLog.objects.log(user_id, object_type, object_ids, action)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def log_save(sender, instance, **kwargs):
+    _log_change(
+        instance.user_id, sender._meta.model_name, [instance.pk],
+        ChangeLog.UPSERT)
+
+
+# Fields the search document of a recipe is built from.
+RECIPE_SEARCH_FIELDS = {'title', 'description'}
+# Recipe relation holding each attribute model.
+RECIPE_ATTR_FIELDS = {Tag: 'tags', Ingredient: 'ingredients'}
+# Attribute model linked by each through model.
+THROUGH_ATTRS = {
+    Recipe.tags.through: Tag,
+    Recipe.ingredients.through: Ingredient,
+}
+
+
+@receiver(post_save, sender=Recipe)
+def index_recipe(sender, instance, update_fields, **kwargs):
+    if update_fields is None or RECIPE_SEARCH_FIELDS & set(update_fields):
+        Recipe.objects.filter(pk=instance.pk).update_search_vector()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def index_renamed_attr(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields is not None and 'name' not in update_fields:
+        return
+    Recipe.objects.filter(
+        **{RECIPE_ATTR_FIELDS[sender]: instance}).update_search_vector()
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def collect_deleted_attr_recipes(sender, instance, **kwargs):
+    # The links go with the row, so the recipes to reindex are read first.
+    instance._linked_recipe_ids = list(Recipe.objects.filter(
+        **{RECIPE_ATTR_FIELDS[sender]: instance}).values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def index_deleted_attr(sender, instance, **kwargs):
+    """Losing a tag/ingredient changes the linked recipes like unlinking it
+    does, see ``touch_on_relink``."""
+    recipe_ids = instance.__dict__.pop('_linked_recipe_ids', None)
+    if recipe_ids and not _deleting(instance.user_id):
+        Recipe.objects.filter(pk__in=recipe_ids).update_search_vector(
+            updated_at=timezone.now())
+        _log_change(instance.user_id, 'recipe', recipe_ids, ChangeLog.UPSERT)
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def log_delete(sender, instance, **kwargs):
+    _log_change(
+        instance.user_id, sender._meta.model_name, [instance.pk],
+        ChangeLog.DELETE)
+
+
+def _relinked_recipe_ids(sender, instance, action, reverse, pk_set):
+    if not reverse:
+        return [instance.pk]
+    # Relinked from the tag/ingredient side: ``pk_set`` holds recipe ids,
+    # except on clear, where they have to be read before the links go.
+    if action == 'pre_clear':
+        instance._cleared_recipe_ids = list(
+            sender.objects.filter(
+                **{f'{instance._meta.model_name}_id': instance.pk}
+            ).values_list('recipe_id', flat=True))
+    elif action == 'post_clear':
+        return instance.__dict__.pop('_cleared_recipe_ids', [])
+    return list(pk_set or [])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def touch_on_relink(sender, instance, action, reverse, pk_set, **kwargs):
+    """Relinking changes a recipe's representation and search document, so
+    it moves the recipe's ``updated_at``, reindexes it and logs an upsert
+    for it."""
+    recipe_ids = _relinked_recipe_ids(
+        sender, instance, action, reverse, pk_set)
+    if not action.startswith('post_') or not recipe_ids:
+        return
+    Recipe.objects.filter(pk__in=recipe_ids).update_search_vector(
+        updated_at=timezone.now())
+    _log_change(instance.user_id, 'recipe', recipe_ids, ChangeLog.UPSERT)
+
+
+def _linked_attr_ids(sender, instance, reverse, pk_set=None):
+    """Attribute id of each link of ``instance``, optionally only those to
+    ``pk_set``. From the attribute side its own id repeats per recipe."""
+    column = f'{THROUGH_ATTRS[sender]._meta.model_name}_id'
+    this, other = (column, 'recipe_id') if reverse else ('recipe_id', column)
+    links = sender.objects.filter(**{this: instance.pk})
+    if pk_set is not None:
+        links = links.filter(**{f'{other}__in': pk_set})
+    return list(links.values_list(column, flat=True))
+
+
+def _count(attr_model, attr_ids, sign):
+    attr_model.objects.adjust_recipe_count({
+        pk: sign * links for pk, links in Counter(attr_ids).items()
+    })
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def count_on_relink(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep ``recipe_count`` of relinked tags/ingredients current.
+
+    ``pk_set`` of an add holds only the links actually created, but that of
+    a remove holds whatever was asked for, so the links that really go are
+    read before they are deleted.
+    """
+    if action == 'post_add':
+        _count(THROUGH_ATTRS[sender],
+               [instance.pk] * len(pk_set) if reverse else pk_set, 1)
+    elif action in ('pre_remove', 'pre_clear'):
+        instance._unlinked_attr_ids = _linked_attr_ids(
+            sender, instance, reverse,
+            pk_set if action == 'pre_remove' else None)
+    elif action in ('post_remove', 'post_clear'):
+        _count(THROUGH_ATTRS[sender],
+               instance.__dict__.pop('_unlinked_attr_ids', []), -1)
+
+
+@receiver(pre_delete, sender=Recipe)
+def collect_deleted_recipe_links(sender, instance, **kwargs):
+    # Deleting a recipe drops its links without an m2m_changed.
+    instance._unlinked_attr_ids = {
+        through: _linked_attr_ids(through, instance, False)
+        for through in THROUGH_ATTRS
+    }
+
+
+@receiver(post_delete, sender=Recipe)
+def count_deleted_recipe(sender, instance, **kwargs):
+    links = instance.__dict__.pop('_unlinked_attr_ids', {})
+    for through, attr_ids in links.items():
+        _count(THROUGH_ATTRS[through], attr_ids, -1)
+
+
+@receiver(pre_save, sender=Recipe)
+def collect_replaced_media(sender, instance, update_fields, **kwargs):
+    if instance._state.adding:
+        instance._old_media = set()
+    elif update_fields is None or RECIPE_MEDIA_FIELDS & set(update_fields):
+        old = Recipe.objects.filter(pk=instance.pk).values(
+            *RECIPE_MEDIA_FIELDS).first()
+        instance._old_media = recipe_media_names(**old) if old else set()
+
+
+@receiver(post_save, sender=Recipe)
+def count_media_refs(sender, instance, **kwargs):
+    """Move the reference counts of the files a save stopped or started
+    pointing at. Re-saving the same content names the same file, so it
+    leaves them alone."""
+    old = instance.__dict__.pop('_old_media', None)
+    if old is None:
+        return
+    new = recipe_media_names(instance.image.name, instance.image_variants)
+    MediaFile.objects.adjust({
+        **{name: 1 for name in new - old},
+        **{name: -1 for name in old - new},
+    })
+
+
+@receiver(post_delete, sender=Recipe)
+def release_media(sender, instance, **kwargs):
+    MediaFile.objects.adjust({
+        name: -1 for name in recipe_media_names(
+            instance.image.name, instance.image_variants)
+    })
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def forget_user_tokens(sender, instance, created, **kwargs):
+    """A cached token carries its user, so any change of the user (being
+    deactivated, a new password, ...) drops it."""
+    if created:
+        return
+    for key in Token.objects.filter(user=instance).values_list(
+            'key', flat=True):
+        invalidate_token(key)
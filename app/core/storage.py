@@ -0,0 +1,73 @@
+"""
+Content-addressed file storage for uploaded media
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+
+# <2 hex>/<sha256><ext>, the first two digits repeated as directory.
+CONTENT_ADDRESSED_NAME = re.compile(
+    r'(^|/)([0-9a-f]{2})/\2[0-9a-f]{62}(\.\w+)?$')
+
+
+def is_content_addressed(name):
+    """Whether ``name`` was given by ContentAddressedStorage, so the
+    content behind it can never change."""
+    return bool(CONTENT_ADDRESSED_NAME.search(name))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Name every file by the SHA-256 of its content.
+
+    ``<dir of the requested name>/<2 hex>/<digest><ext>``: the directory
+    and extension of the name asked for are kept, the rest is replaced.
+    The content is hashed while it is streamed to a temporary file, which
+    is then renamed into place, so identical uploads share one file and
+    saving the same content again writes nothing. Files are never
+    overwritten; which ones are still used is tracked by
+    ``core.models.MediaFile`` and the rest removed by ``gc_media``.
+    """
+    chunk_size = 64 * 1024
+
+    def get_available_name(self, name, max_length=None):
+        # The final name only depends on the content, see _save().
+        return name
+
+    def _save(self, name, content):
+        directory, basename = os.path.split(name)
+        ext = os.path.splitext(basename)[1].lower()
+        full_directory = self.path(directory)
+        os.makedirs(full_directory, exist_ok=True)
+
+        digest = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(
+                dir=full_directory, prefix='.upload-', delete=False) as tmp:
+            try:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks(self.chunk_size):
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            except BaseException:
+                os.unlink(tmp.name)
+                raise
+
+        hexdigest = digest.hexdigest()
+        name = os.path.join(directory, hexdigest[:2], f'{hexdigest}{ext}')
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            os.unlink(tmp.name)
+            # A fresh mtime keeps gc_media from collecting the file before
+            # the new reference is committed.
+            os.utime(path)
+        else:
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp.name, self.file_permissions_mode)
+            os.replace(tmp.name, path)
+        return name.replace('\\', '/')
@@ -0,0 +1,134 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import authentication
+
+TAGS_URL = reverse('recipe:tag-list')
+ME_URL = reverse('user:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        authentication.local_tokens.clear()
+        authentication.get_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def token_queries(self, url=TAGS_URL):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [q for q in ctx.captured_queries
+                if 'authtoken_token' in q['sql']]
+
+    def test_lookup_cached(self):
+        self.assertEqual(len(self.token_queries()), 1)
+        self.assertEqual(self.token_queries(), [])
+        self.assertEqual(self.token_queries(ME_URL), [])
+
+    def test_shared_cache_used_after_local_miss(self):
+        self.token_queries()
+        authentication.local_tokens.clear()
+
+        self.assertEqual(self.token_queries(), [])
+
+    def test_requests_get_own_user(self):
+        self.client.patch(ME_URL, {'name': 'Changed'})
+        self.assertEqual(self.client.get(ME_URL).data['name'], 'Changed')
+
+    def test_cache_holds_no_credentials(self):
+        self.token_queries()
+
+        cached = authentication.get_cache().get(
+            authentication.token_cache_key(self.token.key))
+
+        self.assertEqual(set(cached), set(authentication.CACHED_USER_FIELDS))
+        self.assertNotIn(self.user.password, cached.values())
+
+    def test_cached_user_served_without_queries(self):
+        self.token_queries(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['email'], 'test@example.com')
+
+    def test_update_through_cached_user_keeps_password(self):
+        self.token_queries(ME_URL)
+
+        self.client.patch(ME_URL, {'name': 'Changed'})
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'Changed')
+        self.assertTrue(self.user.check_password('testpass123'))
+
+    def test_invalid_token_rejected(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token nope')
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_rejected(self):
+        self.token_queries()
+
+        self.token.delete()
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        self.token_queries()
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_reloads_user(self):
+        self.token_queries()
+
+        self.user.set_password('newpass123')
+        self.user.save()
+
+        self.assertEqual(len(self.token_queries()), 1)
+
+
+class LocalTokenCacheTests(SimpleTestCase):
+    def test_least_recently_used_evicted(self):
+        tokens = authentication.LocalTokenCache(size=2, timeout=60)
+        tokens.set('a', 1)
+        tokens.set('b', 2)
+        tokens.get('a')
+
+        tokens.set('c', 3)
+
+        self.assertEqual(tokens.get('a'), 1)
+        self.assertIsNone(tokens.get('b'))
+        self.assertEqual(tokens.get('c'), 3)
+
+    @patch('core.authentication.time.monotonic')
+    def test_entries_expire(self, patched_monotonic):
+        tokens = authentication.LocalTokenCache(size=2, timeout=5)
+        patched_monotonic.return_value = 100
+        tokens.set('a', 1)
+
+        patched_monotonic.return_value = 104
+        self.assertEqual(tokens.get('a'), 1)
+        patched_monotonic.return_value = 105
+        self.assertIsNone(tokens.get('a'))
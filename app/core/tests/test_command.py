@@ -1,10 +1,24 @@
+import io
+import tempfile
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2Error
 
-from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.core.management import (
+    CommandError,
+    call_command,
+)
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+)
+
+from core.models import (
+    Recipe,
+    Tag,
+)
 
 
 @patch("core.management.commands.wait_for_db.Command.check")
@@ -22,3 +36,48 @@ class CommandTest(SimpleTestCase):
         call_command("wait_for_db")
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=["default"])
+
+
+class ImportRecipesCommandTest(TestCase):
+    def test_import_recipes(self):
+        user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123')
+        with tempfile.NamedTemporaryFile(suffix='.csv') as csv_file:
+            csv_file.write(
+                b'title,time_minutes,price,tags\n'
+                b'Curry,30,7.50,Thai|Dinner\n'
+                b'Soup,5,2.00,\n'
+            )
+            csv_file.flush()
+            call_command(
+                'import_recipes', csv_file.name, email=user.email,
+                stdout=io.StringIO())
+
+        self.assertEqual(Recipe.objects.filter(user=user).count(), 2)
+        curry = Recipe.objects.get(title='Curry')
+        self.assertEqual(curry.tags.count(), 2)
+        self.assertEqual(
+            list(Tag.objects.values_list('recipe_count', flat=True)), [1, 1])
+
+    def test_unknown_user(self):
+        with self.assertRaises(CommandError):
+            call_command('import_recipes', 'missing.ndjson',
+                         email='nobody@example.com')
+
+
+class RecountAttrsCommandTest(TestCase):
+    def test_repairs_drift(self):
+        user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123')
+        recipe = Recipe.objects.create(
+            user=user, title='Soup', time_minutes=5, price='1.00')
+        tag = Tag.objects.create(user=user, name='Vegan')
+        recipe.tags.add(tag)
+        Tag.objects.update(recipe_count=7)
+
+        out = io.StringIO()
+        call_command('recount_attrs', stdout=out)
+
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 1)
+        self.assertIn('tags: 1 fixed', out.getvalue())
@@ -0,0 +1,149 @@
+import io
+import shutil
+import tempfile
+
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APIClient
+
+from core import images
+from core.models import (
+    ImageJob,
+    Recipe,
+)
+
+MEDIA_ROOT = tempfile.mkdtemp()
+ORIENTATION = 0x0112
+
+
+def jpeg_bytes(size, orientation=None):
+    buffer = io.BytesIO()
+    exif = Image.Exif()
+    if orientation:
+        exif[ORIENTATION] = orientation
+    Image.new('RGB', size, 'red').save(
+        buffer, 'JPEG', exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageJobTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123')
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5,
+            price=Decimal('1.00'))
+
+    def queue(self, content):
+        self.recipe.image.save('photo.jpg', ContentFile(content))
+        return ImageJob.objects.create(
+            recipe=self.recipe, image=self.recipe.image.name)
+
+    def run_worker(self):
+        call_command('process_image_jobs', once=True, stdout=io.StringIO())
+
+    def test_variants_upright_and_stripped(self):
+        # Stored landscape, displayed portrait.
+        job = self.queue(jpeg_bytes((400, 200), orientation=6))
+
+        self.run_worker()
+
+        job.refresh_from_db()
+        self.recipe.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.DONE)
+        variants = self.recipe.image_variants
+        self.assertEqual(set(variants), {'thumb', 'card', 'full'})
+        storage = self.recipe.image.storage
+        for image_format, pil_format in (('jpeg', 'JPEG'), ('webp', 'WEBP')):
+            with storage.open(variants['thumb'][image_format]) as f, \
+                    Image.open(f) as thumb:
+                self.assertEqual(thumb.format, pil_format)
+                self.assertEqual(thumb.size, (80, 160))
+                self.assertFalse(thumb.getexif())
+        with storage.open(variants['full']['jpeg']) as f, \
+                Image.open(f) as full:
+            self.assertEqual(full.size, (200, 400))
+
+    def test_superseded_upload_skipped(self):
+        job = self.queue(jpeg_bytes((20, 20)))
+        job.image = 'uploads/recipe/older.jpg'
+        job.save()
+
+        self.run_worker()
+
+        job.refresh_from_db()
+        self.recipe.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.DONE)
+        self.assertEqual(self.recipe.image_variants, {})
+
+    def test_recipe_deleted_while_rendering(self):
+        self.queue(jpeg_bytes((20, 20)))
+        other = Recipe.objects.create(
+            user=self.user, title='Stew', time_minutes=5,
+            price=Decimal('1.00'))
+        other.image.save('other.jpg', ContentFile(jpeg_bytes((20, 20))))
+        other_job = ImageJob.objects.create(recipe=other,
+                                            image=other.image.name)
+        render = images.render_variants
+
+        def render_then_delete(image_file):
+            variants = render(image_file)
+            # The first job's recipe goes while its variants render.
+            Recipe.objects.filter(pk=self.recipe.pk).delete()
+            return variants
+
+        with patch('core.images.render_variants',
+                   side_effect=render_then_delete):
+            self.assertEqual(images.run_jobs(10), 2)
+
+        other_job.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(other_job.status, ImageJob.DONE)
+        self.assertIn('thumb', other.image_variants)
+        self.assertFalse(ImageJob.objects.filter(status=ImageJob.RUNNING))
+
+    def test_failures_retried_then_given_up(self):
+        job = self.queue(b'not an image')
+
+        self.run_worker()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.FAILED)
+        self.assertEqual(job.attempts, images.MAX_ATTEMPTS)
+        self.assertIn('UnidentifiedImageError', job.error)
+
+    def test_upload_queues_job_and_exposes_urls(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('recipe:recipe-upload-image', args=[self.recipe.id])
+
+        res = client.post(url, {
+            'image': ContentFile(jpeg_bytes((40, 40)), name='photo.jpg'),
+        }, format='multipart')
+
+        self.assertEqual(res.data['image_variants'], {})
+        self.assertEqual(
+            ImageJob.objects.get().image,
+            Recipe.objects.get().image.name)
+
+        self.run_worker()
+        res = client.get(reverse('recipe:recipe-list'))
+        thumb = res.data[0]['image_variants']['thumb']['webp']
+        self.assertTrue(thumb.startswith('http://testserver/'))
+        self.assertTrue(thumb.endswith('.webp'))
@@ -1,6 +1,7 @@
 from unittest.mock import patch
 from decimal import Decimal
-from django.test import TestCase
+from django.db import IntegrityError, transaction
+from django.test import TestCase, TransactionTestCase
 from django.contrib.auth import get_user_model
 from core import models
 
@@ -70,6 +71,75 @@ class ModelTests(TestCase):
         )
         self.assertEqual(str(ingriedient), ingriedient.name)
 
+    def test_attr_names_unique_per_user(self):
+        user = create_user()
+        other_user = create_user(email='other@example.com')
+        for model in (models.Tag, models.Ingredient):
+            model.objects.create(user=user, name='Lemon')
+            model.objects.create(user=other_user, name='Lemon')
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                model.objects.create(user=user, name='Lemon')
+
+    def test_writes_recorded_in_change_log(self):
+        user = create_user()
+        recipe = models.Recipe.objects.create(
+            user=user, title='Soup', time_minutes=5, price=Decimal('1.00'))
+        tag = models.Tag.objects.create(user=user, name='Vegan')
+        tag.recipe_set.add(recipe)
+        tag_id = tag.id
+        tag.delete()
+
+        entries = list(models.ChangeLog.objects.filter(user=user).order_by(
+            'id').values_list('object_type', 'object_id', 'action'))
+        self.assertEqual(entries, [
+            ('recipe', recipe.id, 'upsert'),
+            ('tag', tag_id, 'upsert'),
+            ('recipe', recipe.id, 'upsert'),
+            ('recipe', recipe.id, 'upsert'),
+            ('tag', tag_id, 'delete'),
+        ])
+
+    def test_recipe_counts_follow_links(self):
+        user = create_user()
+        recipes = [
+            models.Recipe.objects.create(
+                user=user, title=f'R{i}', time_minutes=5,
+                price=Decimal('1.00'))
+            for i in range(3)
+        ]
+        vegan = models.Tag.objects.create(user=user, name='Vegan')
+        quick = models.Tag.objects.create(user=user, name='Quick')
+
+        def counts():
+            return [
+                models.Tag.objects.get(pk=tag.pk).recipe_count
+                for tag in (vegan, quick)
+            ]
+
+        recipes[0].tags.add(vegan, quick)
+        recipes[0].tags.add(vegan)
+        vegan.recipe_set.add(*recipes)
+        self.assertEqual(counts(), [3, 1])
+
+        recipes[1].tags.remove(vegan, quick)
+        self.assertEqual(counts(), [2, 1])
+        vegan.recipe_set.remove(recipes[1], recipes[2])
+        self.assertEqual(counts(), [1, 1])
+
+        recipes[0].tags.clear()
+        self.assertEqual(counts(), [0, 0])
+
+        vegan.recipe_set.set(recipes)
+        recipes[2].delete()
+        self.assertEqual(counts(), [2, 0])
+        vegan.recipe_set.clear()
+        self.assertEqual(counts(), [0, 0])
+
+        ingredient = models.Ingredient.objects.create(user=user, name='Salt')
+        recipes[0].ingredients.add(ingredient)
+        ingredient.refresh_from_db()
+        self.assertEqual(ingredient.recipe_count, 1)
+
     @patch('core.models.uuid.uuid4')
     def test_recipe_file_name_uuid(self, mock_uuid):
         uuid = 'test-uuid'
@@ -77,3 +147,36 @@ class ModelTests(TestCase):
         file_path = models.recipe_image_file_path(None, 'expamle.jpg')
 
         self.assertEqual(file_path, f'uploads/recipe/{uuid}.jpg')
+
+
+class UserDeleteTests(TransactionTestCase):
+    def test_delete_user_with_data(self):
+        """The change log rows the cascade would write must not outlive the
+        user, which only shows once the deletion commits."""
+        user = create_user()
+        recipe = models.Recipe.objects.create(
+            user=user, title='Soup', time_minutes=5, price=Decimal('1.00'))
+        tag = models.Tag.objects.create(user=user, name='Vegan')
+        ingredient = models.Ingredient.objects.create(user=user, name='Salt')
+        recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+
+        user.delete()
+
+        self.assertFalse(get_user_model().objects.exists())
+        self.assertFalse(models.Recipe.objects.exists())
+        self.assertFalse(models.ChangeLog.objects.exists())
+
+    def test_deleting_user_leaves_others_logged(self):
+        user = create_user()
+        other = create_user('other@example.com')
+        models.Tag.objects.create(user=user, name='Vegan')
+        tag = models.Tag.objects.create(user=other, name='Vegan')
+
+        user.delete()
+        tag_id = tag.id
+        tag.delete()
+
+        self.assertEqual(
+            models.ChangeLog.objects.filter(user=other).last().object_id,
+            tag_id)
@@ -0,0 +1,64 @@
+import datetime
+import io
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    def test_matches_json_renderer(self):
+        data = {
+            'price': Decimal('5.25'),
+            'at': datetime.datetime(
+                2023, 8, 23, 19, 33, 1, 123456, tzinfo=datetime.timezone.utc),
+            'day': datetime.date(2023, 8, 23),
+            'label': gettext_lazy('Recipe'),
+            'text': 'line\u2028break\u2029',
+            'ids': {3},
+            'nested': [{'id': 1, 'name': 'Thai'}],
+        }
+
+        self.assertEqual(
+            ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_none_renders_empty(self):
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    def test_indent_falls_back(self):
+        res = ORJSONRenderer().render(
+            {'a': 1}, 'application/json; indent=4')
+
+        self.assertEqual(res, b'{\n    "a": 1\n}')
+
+
+class ORJSONParserTests(SimpleTestCase):
+    def test_parse(self):
+        data = ORJSONParser().parse(io.BytesIO(b'{"title": "Soup"}'))
+
+        self.assertEqual(data, {'title': 'Soup'})
+
+    def test_parse_other_encoding(self):
+        stream = io.BytesIO('{"title": "Crêpe"}'.encode('latin-1'))
+
+        data = ORJSONParser().parse(
+            stream, parser_context={'encoding': 'latin-1'})
+
+        self.assertEqual(data, {'title': 'Crêpe'})
+
+    def test_invalid_json(self):
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{"title": '))
+
+    def test_benchmark_command(self):
+        out = io.StringIO()
+
+        call_command('benchmark_json', recipes=10, repeat=1, stdout=out)
+
+        self.assertIn('orjson: render', out.getvalue())
@@ -0,0 +1,123 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import (
+    TestCase,
+    override_settings,
+)
+
+from core.models import (
+    MediaFile,
+    Recipe,
+)
+
+
+def ref_counts():
+    return dict(MediaFile.objects.values_list('name', 'ref_count'))
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        # gc_media walks the whole root, so each test gets its own.
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123')
+        self.recipes = [
+            Recipe.objects.create(
+                user=user, title=title, time_minutes=5,
+                price=Decimal('1.00'))
+            for title in ('Soup', 'Stew')
+        ]
+
+    def gc(self, grace=0):
+        out = io.StringIO()
+        call_command('gc_media', grace=grace, stdout=out)
+        return out.getvalue()
+
+    def test_named_by_content_hash(self):
+        content = b'x' * 200000
+        digest = hashlib.sha256(content).hexdigest()
+
+        name = default_storage.save(
+            'uploads/recipe/photo.JPG', ContentFile(content))
+
+        self.assertEqual(
+            name, f'uploads/recipe/{digest[:2]}/{digest}.jpg')
+        with default_storage.open(name) as f:
+            self.assertEqual(f.read(), content)
+
+    def test_duplicate_uploads_share_one_file(self):
+        for recipe in self.recipes:
+            recipe.image.save('photo.jpg', ContentFile(b'same'))
+        directory = os.path.dirname(self.recipes[0].image.path)
+
+        self.assertEqual(
+            self.recipes[0].image.name, self.recipes[1].image.name)
+        self.assertEqual(os.listdir(directory), [
+            os.path.basename(self.recipes[0].image.name)])
+        self.assertEqual(ref_counts(), {self.recipes[0].image.name: 2})
+
+    def test_reupload_of_same_content_idempotent(self):
+        recipe = self.recipes[0]
+        recipe.image.save('photo.jpg', ContentFile(b'same'))
+        name = recipe.image.name
+
+        recipe.image.save('again.jpg', ContentFile(b'same'))
+
+        self.assertEqual(recipe.image.name, name)
+        self.assertEqual(ref_counts(), {name: 1})
+
+    def test_replaced_and_deleted_images_released(self):
+        recipe = self.recipes[0]
+        recipe.image.save('photo.jpg', ContentFile(b'old'))
+        old = recipe.image.name
+        recipe.image_variants = {'thumb': {'webp': 'variant.webp'}}
+        recipe.save(update_fields=['image_variants'])
+
+        recipe.image.save('photo.jpg', ContentFile(b'new'))
+        new = recipe.image.name
+        recipe.image_variants = {}
+        recipe.save(update_fields=['image_variants'])
+
+        self.assertEqual(
+            ref_counts(), {old: 0, 'variant.webp': 0, new: 1})
+        recipe.delete()
+        self.assertEqual(ref_counts()[new], 0)
+
+    def test_gc_deletes_only_unreferenced_files(self):
+        kept, replaced = self.recipes
+        kept.image.save('photo.jpg', ContentFile(b'kept'))
+        replaced.image.save('photo.jpg', ContentFile(b'old'))
+        old, old_path = replaced.image.name, replaced.image.path
+        replaced.image.save('photo.jpg', ContentFile(b'new'))
+        orphan = default_storage.save(
+            'uploads/recipe/orphan.jpg', ContentFile(b'orphan'))
+
+        self.assertIn('2 file(s), 9 bytes deleted', self.gc())
+
+        self.assertFalse(os.path.exists(old_path))
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertTrue(os.path.exists(kept.image.path))
+        self.assertTrue(os.path.exists(replaced.image.path))
+        self.assertNotIn(old, ref_counts())
+
+    def test_gc_spares_recent_files(self):
+        name = default_storage.save(
+            'uploads/recipe/pending.jpg', ContentFile(b'pending'))
+
+        self.assertIn('0 file(s)', self.gc(grace=3600))
+
+        self.assertTrue(default_storage.exists(name))
@@ -0,0 +1,50 @@
+"""
+Upload handlers keeping request bodies out of worker memory
+"""
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Uploaded file is too large.'
+    default_code = 'upload_too_large'
+
+
+class BoundedUploadHandler(TemporaryFileUploadHandler):
+    """Stream every file of a multipart body to a temporary file, at most
+    ``max_size`` bytes each.
+
+    Unlike the default handlers, small files aren't kept in memory, so a
+    worker holds one chunk per upload whatever the file size. A declared
+    ``Content-Length`` over the limit is refused before the body is read,
+    a file growing past it as soon as the chunk crossing it arrives.
+    """
+    # Room for the multipart boundaries and the other form fields.
+    overhead = 64 * 1024
+
+    def __init__(self, request=None, max_size=None):
+        super().__init__(request)
+        self.max_size = max_size
+        self.received = 0
+
+    def _too_large(self):
+        return UploadTooLarge(
+            f'Uploaded file is larger than {self.max_size} bytes.')
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        if content_length > self.max_size + self.overhead:
+            raise self._too_large()
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.file.close()
+            raise self._too_large()
+        return super().receive_data_chunk(raw_data, start)
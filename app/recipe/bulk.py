@@ -0,0 +1,168 @@
+"""
+Batched writes behind the recipe bulk endpoint
+"""
+from collections import (
+    Counter,
+    defaultdict,
+)
+
+from django.utils import timezone
+
+from core.models import (
+    ChangeLog,
+    ImageJob,
+    MediaFile,
+    Recipe,
+    Tag,
+    Ingredient,
+    recipe_media_names,
+)
+from recipe import cache
+
+ATTR_FIELDS = (('tags', Tag), ('ingredients', Ingredient))
+
+
+class RecipeBulkWriter:
+    """Apply validated creates, updates and deletes of ``user``'s recipes
+    with a fixed number of statements per batch, however many items it
+    holds.
+
+    Recipes are inserted with one ``bulk_create``, updated with one
+    ``bulk_update`` per set of changed fields and deleted with one DELETE;
+    links are added and removed with one statement per relation, and
+    counters, search vectors, media references, the change log and the
+    response cache are brought up to date once for the whole batch.
+    ``known_attrs`` maps each attribute model to the rows of every name the
+    batch uses, see ``get_or_create_attrs``.
+    """
+
+    def __init__(self, user, known_attrs):
+        self.user = user
+        self.known_attrs = known_attrs
+
+    @staticmethod
+    def _split(validated_data):
+        scalars = dict(validated_data)
+        attrs = {field: scalars.pop(field)
+                 for field, _ in ATTR_FIELDS if field in scalars}
+        return scalars, attrs
+
+    def _create(self, items):
+        recipes = [Recipe(user=self.user, **scalars)
+                   for scalars, _ in items]
+        Recipe.objects.bulk_create(recipes)
+        return recipes
+
+    def _update(self, items):
+        """Returns the ids of the recipes whose columns changed."""
+        groups = defaultdict(list)
+        for recipe, (scalars, _) in items:
+            changed = [attr for attr, value in scalars.items()
+                       if getattr(recipe, attr) != value]
+            for attr in changed:
+                setattr(recipe, attr, scalars[attr])
+            if changed:
+                groups[tuple(sorted(changed))].append(recipe)
+        for fields, recipes in groups.items():
+            Recipe.objects.bulk_update(recipes, fields)
+        return {recipe.pk for recipes in groups.values()
+                for recipe in recipes}
+
+    def _link(self, wanted, replaced):
+        """Make each recipe in ``wanted`` (recipe id -> field -> attribute
+        ids) hold exactly those attributes, reading the current links only
+        of the ``replaced`` recipe ids. Returns the relinked recipe ids."""
+        relinked = set()
+        for field, model in ATTR_FIELDS:
+            through = getattr(Recipe, field).through
+            column = f'{model._meta.model_name}_id'
+            targets = {pk: attrs[field] for pk, attrs in wanted.items()
+                       if field in attrs}
+            current = defaultdict(set)
+            stale, deltas = [], Counter()
+            for link_id, recipe_id, attr_id in through.objects.filter(
+                    recipe_id__in=[pk for pk in replaced if pk in targets]
+            ).values_list('id', 'recipe_id', column):
+                current[recipe_id].add(attr_id)
+                if attr_id not in targets[recipe_id]:
+                    stale.append(link_id)
+                    deltas[attr_id] -= 1
+                    relinked.add(recipe_id)
+            added = []
+            for recipe_id, attr_ids in targets.items():
+                for attr_id in attr_ids:
+                    if attr_id not in current[recipe_id]:
+                        added.append(through(
+                            recipe_id=recipe_id, **{column: attr_id}))
+                        deltas[attr_id] += 1
+                        relinked.add(recipe_id)
+            if stale:
+                through.objects.filter(id__in=stale).delete()
+            if added:
+                through.objects.bulk_create(added)
+            model.objects.adjust_recipe_count(deltas)
+        return relinked
+
+    def write(self, creates, updates):
+        """Create recipes from the ``creates`` validated data and apply
+        ``(recipe, validated data)`` ``updates``; returns the created
+        recipes in order. Call inside a transaction."""
+        creates = [self._split(data) for data in creates]
+        updates = [(recipe, self._split(data)) for recipe, data in updates]
+        created = self._create(creates)
+        changed = self._update(updates)
+
+        wanted = {}
+        for recipe, (_, attrs) in [*zip(created, creates), *updates]:
+            wanted[recipe.pk] = {
+                field: list(dict.fromkeys(
+                    self.known_attrs[model][attr['name']].pk
+                    for attr in attrs[field]))
+                for field, model in ATTR_FIELDS if field in attrs
+            }
+        relinked = self._link(
+            wanted, [recipe.pk for recipe, _ in updates])
+
+        # bulk_create/bulk_update send no signals: reindex, bump
+        # updated_at, log and invalidate here, once for the batch.
+        touched = [recipe.pk for recipe in created] + [
+            recipe.pk for recipe, _ in updates
+            if recipe.pk in changed or recipe.pk in relinked]
+        if touched:
+            Recipe.objects.filter(pk__in=touched).update_search_vector(
+                updated_at=timezone.now())
+            ChangeLog.objects.log(
+                self.user.pk, 'recipe', touched, ChangeLog.UPSERT)
+            cache.invalidate_user(self.user.pk)
+        return created
+
+    def delete(self, recipe_ids):
+        """Delete the recipes ``recipe_ids`` without the per-row signal
+        handlers of ``QuerySet.delete``, doing their work once for the
+        batch. Call inside a transaction."""
+        recipes = Recipe.objects.filter(user=self.user, pk__in=recipe_ids)
+        deleted, media = [], Counter()
+        for pk, image, image_variants in recipes.values_list(
+                'pk', 'image', 'image_variants'):
+            deleted.append(pk)
+            media.update(recipe_media_names(image, image_variants))
+        if not deleted:
+            return
+
+        for field, model in ATTR_FIELDS:
+            links = getattr(Recipe, field).through.objects.filter(
+                recipe_id__in=deleted)
+            model.objects.adjust_recipe_count({
+                pk: -count for pk, count in Counter(links.values_list(
+                    f'{model._meta.model_name}_id', flat=True)).items()
+            })
+            links.delete()
+        # Nothing else refers to a recipe, so the rows can go in one
+        # statement instead of the collector's per-row signals.
+        ImageJob.objects.filter(recipe_id__in=deleted).delete()
+        recipes._raw_delete(recipes.db)
+        MediaFile.objects.adjust(
+            {name: -count for name, count in media.items()})
+        ChangeLog.objects.log(
+            self.user.pk, 'recipe', deleted, ChangeLog.DELETE)
+        cache.invalidate_user(self.user.pk)
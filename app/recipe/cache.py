@@ -0,0 +1,84 @@
+"""
+Per-user response cache for the recipe API
+"""
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+HITS_KEY = 'recipe:cache:hits'
+MISSES_KEY = 'recipe:cache:misses'
+# Params holding comma separated ids, where order does not change the result.
+ID_LIST_PARAMS = ('tags', 'ingredients')
+
+
+def get_cache():
+    return caches[settings.RECIPE_CACHE_ALIAS]
+
+
+def _version_key(user_id):
+    return f'recipe:version:{user_id}'
+
+
+def get_user_version(user_id):
+    store = get_cache()
+    version = store.get(_version_key(user_id))
+    if version is None:
+        # Seed from the clock so a counter that was evicted never comes
+        # back at a value that still has responses stored under it.
+        version = time.time_ns()
+        if not store.add(_version_key(user_id), version, None):
+            version = store.get(_version_key(user_id), version)
+    return version
+
+
+def _bump(user_id):
+    store = get_cache()
+    try:
+        store.incr(_version_key(user_id))
+    except ValueError:
+        store.set(_version_key(user_id), time.time_ns(), None)
+
+
+def invalidate_user(user_id):
+    """Drop every cached response of ``user_id``.
+
+    Bumps now, so reads inside the writing transaction miss, and again on
+    commit, so a read that raced the commit cannot leave pre-commit data
+    cached under the current version.
+    """
+    _bump(user_id)
+    transaction.on_commit(lambda: _bump(user_id))
+
+
+def make_key(request, version):
+    params = sorted(
+        (key, ','.join(sorted(value.split(',')))
+         if key in ID_LIST_PARAMS else value)
+        for key, values in request.query_params.lists()
+        for value in values
+    )
+    raw = f'{request.get_host()}{request.path}?{urlencode(params)}'
+    digest = hashlib.md5(raw.encode()).hexdigest()
+    return f'recipe:response:{request.user.pk}:{version}:{digest}'
+
+
+def record(hit):
+    store = get_cache()
+    key = HITS_KEY if hit else MISSES_KEY
+    try:
+        store.incr(key)
+    except ValueError:
+        if not store.add(key, 1, None):
+            store.incr(key)
+
+
+def get_stats():
+    values = get_cache().get_many([HITS_KEY, MISSES_KEY])
+    return {
+        'hits': values.get(HITS_KEY, 0),
+        'misses': values.get(MISSES_KEY, 0),
+    }
@@ -0,0 +1,231 @@
+"""
+Filter backends for the recipe API
+"""
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramWordSimilarity,
+)
+from django.db.models import (
+    Exists,
+    F,
+    Lookup,
+    OuterRef,
+)
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import (
+    BaseFilterBackend,
+    OrderingFilter,
+)
+
+from core.models import (
+    Recipe,
+    SEARCH_CONFIG,
+)
+
+
+def params_to_ints(param, value):
+    try:
+        return sorted({int(str_id) for str_id in value.split(',')})
+    except ValueError:
+        raise ValidationError(
+            {param: 'Expected a comma separated list of IDs.'}
+        )
+
+
+class ILike(Lookup):
+    """Case-insensitive LIKE that, unlike ``istartswith``'s
+    ``UPPER(col) LIKE UPPER(...)``, a trigram index on the column serves."""
+    lookup_name = 'ilike'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} ILIKE {rhs}', [*lhs_params, *rhs_params]
+
+
+def like_escape(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class RecipeAttrFilter(BaseFilterBackend):
+    """Filter recipes by the ``tags`` and ``ingredients`` id lists.
+
+    Each list compiles to an EXISTS semi-join on the M2M through table, so
+    a recipe linked to several of the ids is still returned once and the
+    result needs no DISTINCT. ``match=all`` keeps only recipes linked to
+    every id instead of any of them.
+    """
+    match_param = 'match'
+    match_modes = ('any', 'all')
+    attr_params = (
+        ('tags', Recipe.tags.through, 'tag_id'),
+        ('ingredients', Recipe.ingredients.through, 'ingredient_id'),
+    )
+
+    def get_match_mode(self, request):
+        match = request.query_params.get(self.match_param) or 'any'
+        if match not in self.match_modes:
+            raise ValidationError(
+                {self.match_param: f'Must be one of {self.match_modes}.'}
+            )
+        return match
+
+    def filter_queryset(self, request, queryset, view):
+        match = self.get_match_mode(request)
+        for param, through, column in self.attr_params:
+            value = request.query_params.get(param)
+            if not value:
+                continue
+            ids = params_to_ints(param, value)
+            links = through.objects.filter(recipe_id=OuterRef('pk'))
+            if match == 'all':
+                for attr_id in ids:
+                    queryset = queryset.filter(
+                        Exists(links.filter(**{column: attr_id}))
+                    )
+            else:
+                queryset = queryset.filter(
+                    Exists(links.filter(**{f'{column}__in': ids}))
+                )
+        return queryset
+
+
+class TopMatchesFilter(BaseFilterBackend):
+    """Base of filters whose results are ranked, not paged: lists return
+    the top ``limit`` matches."""
+    limit_param = 'limit'
+    default_limit = 10
+    max_limit = 50
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params.get(
+                self.limit_param, self.default_limit))
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            raise ValidationError(
+                {self.limit_param: 'Expected a positive integer.'})
+        return min(limit, self.max_limit)
+
+
+class RecipeSearchFilter(TopMatchesFilter):
+    """Full-text ``search`` over title, tag and ingredient names and
+    description.
+
+    The query uses web search syntax (quoted phrases, ``or``, ``-word``)
+    and matches against the stored, GIN indexed ``Recipe.search_vector``.
+    Results are ordered by rank, best first, unless ``ordering`` is given.
+    Keyset pages would re-sort them, so lists return the top ``limit``
+    matches instead (see ``RecipeViewSet.filter_queryset``) and reject a
+    ``cursor``.
+    """
+    search_param = 'search'
+    default_limit = 100
+    max_limit = 1000
+
+    @classmethod
+    def is_active(cls, request):
+        return bool(request.query_params.get(cls.search_param, '').strip())
+
+    def filter_queryset(self, request, queryset, view):
+        value = request.query_params.get(self.search_param, '').strip()
+        if not value:
+            return queryset
+        query = SearchQuery(
+            value, search_type='websearch', config=SEARCH_CONFIG)
+        return queryset.filter(search_vector=query).order_by(
+            SearchRank(F('search_vector'), query).desc(), '-id')
+
+
+class NameLookupFilter(TopMatchesFilter):
+    """Autocomplete on ``name``: the top ``limit`` names starting with
+    ``prefix``, or the top ``limit`` fuzzy matches of ``q`` by trigram
+    word similarity, best first.
+
+    Both run on the per user ``(user, name gin_trgm_ops)`` index.
+    """
+    prefix_param = 'prefix'
+    query_param = 'q'
+
+    @classmethod
+    def is_active(cls, request):
+        return any(request.query_params.get(param)
+                   for param in (cls.prefix_param, cls.query_param))
+
+    def filter_queryset(self, request, queryset, view):
+        if not self.is_active(request):
+            return queryset
+        prefix = request.query_params.get(self.prefix_param)
+        if prefix:
+            queryset = queryset.filter(
+                ILike(F('name'), f'{like_escape(prefix)}%')
+            ).order_by('name')
+        query = request.query_params.get(self.query_param)
+        if query:
+            queryset = queryset.filter(name__trigram_word_similar=query) \
+                .order_by(TrigramWordSimilarity(query, 'name').desc(), 'name')
+        return queryset[:self.get_limit(request)]
+
+
+class RecipeRangeFilter(BaseFilterBackend):
+    """Bound recipes by ``min_price``, ``max_price`` and ``max_time``."""
+    range_params = (
+        ('min_price', 'price__gte',
+         serializers.DecimalField(max_digits=5, decimal_places=2)),
+        ('max_price', 'price__lte',
+         serializers.DecimalField(max_digits=5, decimal_places=2)),
+        ('max_time', 'time_minutes__lte',
+         serializers.IntegerField(min_value=0)),
+    )
+
+    def filter_queryset(self, request, queryset, view):
+        bounds, errors = {}, {}
+        for param, lookup, field in self.range_params:
+            value = request.query_params.get(param)
+            if value is None:
+                continue
+            try:
+                bounds[lookup] = field.run_validation(value)
+            except ValidationError as exc:
+                errors[param] = exc.detail
+        if errors:
+            raise ValidationError(errors)
+        return queryset.filter(**bounds)
+
+
+class KeysetOrderingFilter(OrderingFilter):
+    """``ordering`` by one of the view's ``ordering_fields``, either way.
+
+    Ties are broken on id in the same direction, so the ``(user, <field>)``
+    indexes serve the sort and keyset pages stay stable. Unknown values are
+    rejected instead of ignored, and without the param the queryset keeps
+    its own order (e.g. search rank).
+    """
+
+    def get_choices(self, view):
+        return [f'{prefix}{field}'
+                for field in view.ordering_fields for prefix in ('', '-')]
+
+    def get_ordering(self, request, queryset, view):
+        value = request.query_params.get(self.ordering_param)
+        if value is None:
+            return self.get_default_ordering(view)
+        if value not in self.get_choices(view):
+            raise ValidationError({self.ordering_param: (
+                f'Must be one of {", ".join(self.get_choices(view))}.')})
+        if value.lstrip('-') == 'id':
+            return [value]
+        return [value, '-id' if value.startswith('-') else 'id']
+
+    def get_ordering_columns(self, request, view):
+        """The columns the keyset cursor is read from."""
+        return [name.lstrip('-')
+                for name in self.get_ordering(request, None, view)]
+
+    def filter_queryset(self, request, queryset, view):
+        if self.ordering_param not in request.query_params:
+            return queryset
+        return super().filter_queryset(request, queryset, view)
@@ -0,0 +1,315 @@
+"""
+Bulk import of recipes from NDJSON or CSV
+"""
+import codecs
+import csv
+import io
+from collections import Counter
+from decimal import (
+    Decimal,
+    InvalidOperation,
+)
+from itertools import islice
+
+import orjson
+from django.db import (
+    connection,
+    models,
+    transaction,
+)
+from rest_framework import serializers as drf_serializers
+
+from core.models import (
+    ChangeLog,
+    Recipe,
+    Tag,
+    Ingredient
+)
+from recipe import cache
+from recipe.renderers import CSVRenderer
+from recipe.serializers import get_or_create_attrs
+
+FORMATS = ('ndjson', 'csv')
+ATTR_FIELDS = (('tags', Tag), ('ingredients', Ingredient))
+
+
+class RecipeImportError(Exception):
+    def __init__(self, line, errors):
+        super().__init__(f'Line {line}: {errors}')
+        self.line = line
+        self.errors = errors
+
+
+def parse_ndjson(stream):
+    """Yield ``(line number, row)`` from an iterable of byte lines."""
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = orjson.loads(line)
+        except orjson.JSONDecodeError as exc:
+            raise RecipeImportError(number, {'non_field_errors': [str(exc)]})
+        if not isinstance(row, dict):
+            raise RecipeImportError(
+                number, {'non_field_errors': ['Expected an object.']})
+        yield number, row
+
+
+def parse_csv(stream):
+    """Yield ``(line number, row)`` from an iterable of byte lines, in the
+    layout written by the CSV export."""
+    reader = csv.DictReader(codecs.iterdecode(stream, 'utf-8'))
+    separator = CSVRenderer.list_separator
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except (UnicodeDecodeError, csv.Error) as exc:
+            # Raised while reading the line after the last one returned.
+            raise RecipeImportError(
+                reader.line_num + 1, {'non_field_errors': [str(exc)]})
+        for field, _ in ATTR_FIELDS:
+            value = row.get(field) or ''
+            row[field] = [name for name in value.split(separator) if name]
+        # line_num counts physical lines, header included.
+        yield reader.line_num, row
+
+
+PARSERS = {'ndjson': parse_ndjson, 'csv': parse_csv}
+
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    if type(value) is int:
+        return str(value)
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace(
+        '\n', '\\n').replace('\r', '\\r')
+
+
+def copy_rows(cursor, table, columns, rows):
+    """Write ``rows`` into ``table`` with a single COPY ... FROM STDIN."""
+    buffer = io.StringIO()
+    buffer.writelines(
+        '\t'.join(_copy_value(value) for value in row) + '\n'
+        for row in rows
+    )
+    buffer.seek(0)
+    cursor.copy_expert(
+        f'COPY {table} ({", ".join(columns)}) FROM STDIN', buffer)
+
+
+def _copy_prep(field, obj, db):
+    value = field.pre_save(obj, True)
+    # The driver adapter JSONField prepares to has no COPY text form.
+    if isinstance(field, models.JSONField):
+        return None if value is None else orjson.dumps(value).decode()
+    return field.get_db_prep_save(value, db)
+
+
+def copy_objects(cursor, objs):
+    """COPY unsaved model instances whose pk is already assigned. Values
+    are prepared the way ``bulk_create`` prepares them."""
+    opts = objs[0]._meta
+    fields = opts.concrete_fields
+    db = cursor.db
+    copy_rows(
+        cursor,
+        opts.db_table,
+        [field.column for field in fields],
+        (
+            [_copy_prep(field, obj, db) for field in fields]
+            for obj in objs
+        ),
+    )
+
+
+def _text(max_length=None, allow_blank=False):
+    def coerce(value):
+        if isinstance(value, bool) or not isinstance(
+                value, (str, int, float)):
+            raise drf_serializers.ValidationError('Not a valid string.')
+        value = str(value).strip()
+        if not value and not allow_blank:
+            raise drf_serializers.ValidationError(
+                'This field may not be blank.')
+        if max_length is not None and len(value) > max_length:
+            raise drf_serializers.ValidationError(
+                f'Ensure this field has no more than {max_length} '
+                f'characters.')
+        if '\x00' in value:
+            raise drf_serializers.ValidationError(
+                'Null characters are not allowed.')
+        return value
+    return coerce
+
+
+def _integer(value):
+    if type(value) is not int:
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        elif isinstance(value, str) and value.strip().lstrip('+-').isdigit():
+            value = int(value)
+        else:
+            raise drf_serializers.ValidationError(
+                'A valid integer is required.')
+    if not -2 ** 31 <= value < 2 ** 31:
+        raise drf_serializers.ValidationError(
+            'Ensure this value fits in a 32 bit integer.')
+    return value
+
+
+def _decimal(max_digits, decimal_places):
+    step = Decimal(1).scaleb(-decimal_places)
+    limit = Decimal(10) ** (max_digits - decimal_places)
+
+    def coerce(value):
+        if isinstance(value, bool) or not isinstance(
+                value, (str, int, float)):
+            raise drf_serializers.ValidationError(
+                'A valid number is required.')
+        try:
+            number = Decimal(str(value).strip())
+        except InvalidOperation:
+            number = None
+        if number is None or not number.is_finite():
+            raise drf_serializers.ValidationError(
+                'A valid number is required.')
+        quantized = number.quantize(step)
+        if quantized != number:
+            raise drf_serializers.ValidationError(
+                f'Ensure that there are no more than {decimal_places} '
+                f'decimal places.')
+        if abs(quantized) >= limit:
+            raise drf_serializers.ValidationError(
+                f'Ensure that there are no more than '
+                f'{max_digits - decimal_places} digits before the decimal '
+                f'point.')
+        return quantized
+    return coerce
+
+
+# (required, coercion) of each scalar field: the checks of
+# RecipeDetailSerializer, as plain functions cheap enough to run per value.
+SCALAR_FIELDS = {
+    'title': (True, _text(max_length=255)),
+    'time_minutes': (True, _integer),
+    'price': (True, _decimal(max_digits=5, decimal_places=2)),
+    'link': (False, _text(max_length=255, allow_blank=True)),
+    'description': (False, _text(allow_blank=True)),
+}
+# Coercion of tag and ingredient names, the nested serializers' CharField.
+ATTR_NAME = _text(max_length=255)
+
+
+class RecipeImporter:
+    """Create recipes of ``user`` from parsed rows, ``chunk_size`` at a time.
+
+    Values are checked with the plain functions of ``SCALAR_FIELDS`` and
+    ``ATTR_NAME`` rather than serializer fields. Tag and ingredient names
+    are resolved once per import and kept in memory; recipes and their
+    links are written with COPY. The whole import is one transaction.
+    """
+
+    def __init__(self, user, chunk_size=2000, progress=None):
+        self.user = user
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.known = {model: {} for _, model in ATTR_FIELDS}
+        self.created = 0
+
+    def _attr_names(self, value):
+        if not isinstance(value, list):
+            raise drf_serializers.ValidationError('Expected a list.')
+        return list(dict.fromkeys(
+            ATTR_NAME(item.get('name') if isinstance(item, dict) else item)
+            for item in value
+        ))
+
+    def validate(self, number, row):
+        values, errors = {}, {}
+        for name, (required, coerce) in SCALAR_FIELDS.items():
+            if name in row:
+                try:
+                    values[name] = coerce(row[name])
+                except drf_serializers.ValidationError as exc:
+                    errors[name] = exc.detail
+            elif required:
+                errors[name] = ['This field is required.']
+        for name, _ in ATTR_FIELDS:
+            try:
+                values[name] = self._attr_names(row.get(name) or [])
+            except drf_serializers.ValidationError as exc:
+                errors[name] = exc.detail
+        if errors:
+            raise RecipeImportError(number, errors)
+        return values
+
+    def _resolve(self, model, rows, field):
+        known = self.known[model]
+        missing = list(dict.fromkeys(
+            name for row in rows for name in row[field]
+            if name not in known
+        ))
+        if missing:
+            known.update(get_or_create_attrs(model, self.user, missing))
+        return known
+
+    def _import_chunk(self, rows):
+        recipes = [
+            Recipe(user=self.user, **{
+                name: row[name] for name in SCALAR_FIELDS if name in row
+            })
+            for row in rows
+        ]
+        with connection.cursor() as cursor:
+            # COPY cannot return ids, so take them from the sequence first.
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) "
+                "FROM generate_series(1, %s)",
+                [Recipe._meta.db_table, len(recipes)],
+            )
+            for recipe, (pk,) in zip(recipes, cursor.fetchall()):
+                recipe.pk = pk
+            copy_objects(cursor, recipes)
+
+            for field, model in ATTR_FIELDS:
+                known = self._resolve(model, rows, field)
+                through = getattr(Recipe, field).through
+                links = [
+                    (recipe.pk, known[name].pk)
+                    for recipe, row in zip(recipes, rows)
+                    for name in row[field]
+                ]
+                copy_rows(
+                    cursor,
+                    through._meta.db_table,
+                    ['recipe_id', f'{model._meta.model_name}_id'],
+                    links,
+                )
+                model.objects.adjust_recipe_count(
+                    Counter(attr_id for _, attr_id in links))
+        ids = [recipe.pk for recipe in recipes]
+        # COPY bypasses the signals that keep the search index (and, above,
+        # the recipe counters) current.
+        Recipe.objects.filter(pk__in=ids).update_search_vector()
+        ChangeLog.objects.log(self.user.pk, 'recipe', ids, ChangeLog.UPSERT)
+        self.created += len(recipes)
+        if self.progress:
+            self.progress(self.created)
+
+    def run(self, parsed_rows):
+        """Import ``(line number, row)`` pairs; returns the number created.
+        Raises ``RecipeImportError`` for the first invalid row, leaving the
+        database untouched."""
+        validated = (self.validate(number, row) for number, row in parsed_rows)
+        with transaction.atomic():
+            while True:
+                chunk = list(islice(validated, self.chunk_size))
+                if not chunk:
+                    break
+                self._import_chunk(chunk)
+            # bulk_create sends no signals, so invalidate by hand.
+            cache.invalidate_user(self.user.pk)
+        return self.created
@@ -0,0 +1,210 @@
+"""
+View mixins for the recipe API
+"""
+import hashlib
+
+from django.conf import settings
+from django.db.models import Prefetch
+from django.utils.cache import (
+    get_conditional_response,
+    patch_vary_headers,
+)
+from django.utils.http import quote_etag
+from rest_framework import (
+    serializers,
+    status,
+)
+from rest_framework.response import Response
+
+from recipe import cache
+from recipe.fast_serializers import FastReadSerializer
+
+
+class CachedListMixin:
+    """Serve ``cached_actions`` from the per-user response cache.
+
+    Entries are keyed by user, the user's data version and the normalized
+    query string; any write to the user's recipes, tags or ingredients
+    bumps the version (see ``recipe.signals``), so stale entries are never
+    read again and simply expire.
+    """
+    cached_actions = ('list',)
+    # Validator headers stored with the body, so a hit can still answer 304.
+    replayed_headers = ('ETag', 'Vary')
+
+    def get_cached_response(self, build, request, *args, **kwargs):
+        if self.action not in self.cached_actions:
+            return build(request, *args, **kwargs)
+
+        store = cache.get_cache()
+        key = cache.make_key(
+            request, cache.get_user_version(request.user.pk))
+        entry = store.get(key)
+        cache.record(hit=entry is not None)
+        if entry is not None:
+            headers = entry['headers']
+            response = (not_modified(request, headers.get('ETag'))
+                        or Response(entry['data']))
+            for header, value in headers.items():
+                response[header] = value
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = build(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            store.set(key, {
+                'data': response.data,
+                'headers': {
+                    header: response[header]
+                    for header in self.replayed_headers
+                    if response.has_header(header)
+                },
+            }, settings.RECIPE_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().list, request, *args, **kwargs)
+
+
+def not_modified(request, etag):
+    """Return a 304 response if the request's ``If-None-Match`` says the
+    client already holds the representation tagged ``etag``."""
+    return get_conditional_response(request, etag=etag)
+
+
+class ConditionalGetMixin:
+    """ETag support for ``conditional_actions``.
+
+    The ETag is derived from the user's data version (see
+    ``recipe.cache``), which every write to their recipes, tags or
+    ingredients bumps, deletes included, so validating a request costs a
+    cache read and no query. A matching ``If-None-Match`` short-circuits
+    to a 304.
+    """
+    conditional_actions = ('list', 'retrieve')
+
+    def get_validators(self, request):
+        if (self.action == 'retrieve'
+                and request.headers.get('If-None-Match', '').strip() == '*'):
+            # '*' matches any existing object, which only retrieve knows.
+            return None
+        raw = '|'.join([
+            str(request.user.pk),
+            str(cache.get_user_version(request.user.pk)),
+            request.accepted_renderer.format,
+            request.get_full_path(),
+        ])
+        return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+    def get_conditional_response(self, build, request, *args, **kwargs):
+        etag = None
+        if self.action in self.conditional_actions:
+            etag = self.get_validators(request)
+        if etag is None:
+            return build(request, *args, **kwargs)
+
+        response = not_modified(request, etag)
+        if response is None:
+            response = build(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        response['ETag'] = etag
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            super().retrieve, request, *args, **kwargs)
+
+
+class SparseFieldsMixin:
+    """``fields``/``omit``/``expand`` query params for ``sparse_actions``.
+
+    The params are handed to the serializer (see ``DynamicFieldsMixin``)
+    and ``get_sparse_queryset()`` loads only the columns and relations
+    the trimmed serializer renders.
+    """
+    sparse_actions = ('list', 'retrieve')
+    sparse_params = ('fields', 'omit', 'expand')
+
+    def get_sparse_kwargs(self):
+        if self.action not in self.sparse_actions:
+            return {}
+        return {
+            param: [name for name in value.split(',') if name]
+            for param, value in (
+                (param, self.request.query_params.get(param))
+                for param in self.sparse_params
+            )
+            if value is not None
+        }
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs = {**self.get_sparse_kwargs(), **kwargs}
+        return super().get_serializer(*args, **kwargs)
+
+    def get_required_columns(self):
+        """Columns loaded whatever the client asked for, e.g. the ones
+        pagination reads its cursor from."""
+        return ()
+
+    @staticmethod
+    def _only(model, names):
+        columns = {field.name for field in model._meta.concrete_fields}
+        return [name for name in names if name in columns] or ['pk']
+
+    def get_sparse_queryset(self, queryset):
+        model = queryset.model
+        fields = self.get_serializer().fields
+        queryset = queryset.only(
+            *self._only(model, [*fields, *self.get_required_columns()]))
+        for name, field in fields.items():
+            relation = model._meta.get_field(name)
+            if not relation.many_to_many:
+                continue
+            related = relation.related_model.objects.order_by('pk')
+            if isinstance(field, serializers.ListSerializer):
+                related = related.only(
+                    *self._only(related.model, field.child.fields))
+            else:
+                related = related.only('pk')
+            queryset = queryset.prefetch_related(
+                Prefetch(name, queryset=related))
+        return queryset
+
+
+class FastReadMixin(SparseFieldsMixin):
+    """Serve ``fast_read_actions`` with ``FastReadSerializer``.
+
+    The view's serializer still defines the output; only the way it is
+    produced changes, from model instances to ``values()`` rows.
+    """
+    fast_read_actions = ('list',)
+
+    def use_fast_read(self):
+        # Schema generation needs the real serializer.
+        return self.action in self.fast_read_actions and \
+            not getattr(self, 'swagger_fake_view', False)
+
+    def get_serializer(self, *args, **kwargs):
+        if not self.use_fast_read():
+            return super().get_serializer(*args, **kwargs)
+        kwargs = {
+            'context': self.get_serializer_context(),
+            **self.get_sparse_kwargs(),
+            **kwargs,
+        }
+        return FastReadSerializer(
+            self.get_serializer_class(), *args, **kwargs)
+
+    def get_sparse_queryset(self, queryset):
+        if not self.use_fast_read():
+            return super().get_sparse_queryset(queryset)
+        return self.get_serializer().get_values_queryset(
+            queryset, self.get_required_columns())
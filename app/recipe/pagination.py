@@ -0,0 +1,106 @@
+"""
+Keyset pagination for the recipe API
+"""
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """Opt-in cursor pagination on ``-id``, or the view's ordering.
+
+    Lists stay unpaginated unless the client sends ``limit`` or ``cursor``,
+    so existing clients keep receiving a plain array. The cursor holds the
+    value of every ordering column, id included, and each page seeks past
+    it with ``WHERE (f > v) OR (f = v AND id > <id>)`` instead of an
+    OFFSET, so deep pages and long runs of equal sort values cost the same
+    as the first page.
+    """
+    ordering = '-id'
+    page_size = 100
+    page_size_query_param = 'limit'
+    max_page_size = 1000
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            name = order.lstrip('-')
+            value = (instance[name] if isinstance(instance, dict)
+                     else getattr(instance, name))
+            values.append(str(value))
+        return json.dumps(values)
+
+    def get_seek_filter(self, position, reverse):
+        """``Q`` matching the rows after ``position`` in the order the page
+        is read: lexicographically greater on the ordering columns."""
+        try:
+            values = json.loads(position)
+        except ValueError:
+            values = None
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        lookups = [
+            (order.lstrip('-'),
+             'lt' if order.startswith('-') != reverse else 'gt',
+             value)
+            for order, value in zip(self.ordering, values)
+        ]
+        seek, equal = Q(), {}
+        for name, lookup, value in lookups:
+            seek |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        if len(lookups) > 1:
+            # Implied by the OR, but lets an index on the first column
+            # start its range scan at the cursor.
+            name, lookup, value = lookups[0]
+            seek &= Q(**{f'{name}__{lookup}e': value})
+        return seek
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if (self.cursor_query_param not in params
+                and self.page_size_query_param not in params):
+            return None
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, current_position = self.cursor or (0, False, None)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [order[1:] if order.startswith('-') else f'-{order}'
+                        for order in ordering]
+        queryset = queryset.order_by(*ordering)
+        if current_position is not None:
+            try:
+                queryset = queryset.filter(
+                    self.get_seek_filter(current_position, reverse))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        # Positions end in the id, so they are unique and the links never
+        # need an offset; one in a cursor is still honoured.
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        following_position = None
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = following_position is not None
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = following_position is not None
+            self.has_previous = current_position is not None or offset > 0
+            self.next_position = following_position
+            self.previous_position = current_position
+        self.display_page_controls = self.has_previous or self.has_next
+        return self.page
@@ -0,0 +1,64 @@
+"""
+Renderers for recipe exports
+"""
+import csv
+import io
+
+from rest_framework.renderers import BaseRenderer
+
+from core.renderers import ORJSONRenderer
+
+
+class NDJSONRenderer(BaseRenderer):
+    """One JSON document per line; a list renders as one line per item."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        json = ORJSONRenderer()
+        rows = data if isinstance(data, list) else [data]
+        return b''.join(json.render(row) + b'\n' for row in rows)
+
+
+class CSVRenderer(BaseRenderer):
+    """Rows of a list of flat dicts, list values joined with
+    ``list_separator`` (names for nested objects, ids otherwise) and dict
+    values as JSON.
+
+    The header is taken from ``renderer_context['fields']`` or the first
+    row, and left out when ``renderer_context['header']`` is false, so
+    the chunks of one export can be rendered separately.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+    list_separator = '|'
+
+    def _cell(self, value):
+        if isinstance(value, list):
+            return self.list_separator.join(
+                str(item['name'] if isinstance(item, dict) else item)
+                for item in value
+            )
+        if isinstance(value, dict):
+            return ORJSONRenderer().render(value).decode() if value else ''
+        return value
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        fields = renderer_context.get('fields') or (
+            list(rows[0]) if rows else [])
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if renderer_context.get('header', True):
+            writer.writerow(fields)
+        writer.writerows(
+            [self._cell(row.get(name)) for name in fields] for row in rows)
+        return buffer.getvalue().encode(self.charset)
@@ -1,29 +1,165 @@
+import os
+
+from django.conf import settings
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
+from core import images
 from core.models import (
+    ChangeLog,
     Recipe,
     Tag,
     Ingredient
 )
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+def get_or_create_attrs(model, user, names):
+    """Map ``names`` to ``model`` rows of ``user`` with one SELECT, inserting
+    the missing ones in bulk. ON CONFLICT lets concurrent writers race
+    safely. bulk_create sends no post_save, so inserts are logged here."""
+    found = {
+        obj.name: obj
+        for obj in model.objects.filter(user=user, name__in=names)
+    }
+    missing = [name for name in names if name not in found]
+    if missing:
+        model.objects.bulk_create(
+            [model(user=user, name=name) for name in missing],
+            ignore_conflicts=True,
+        )
+        created = model.objects.filter(user=user, name__in=missing)
+        found.update((obj.name, obj) for obj in created)
+        ChangeLog.objects.log(
+            user.pk, model._meta.model_name,
+            [found[name].pk for name in missing], ChangeLog.UPSERT)
+    return found
+
+
+class DynamicFieldsMixin:
+    """Trim the output to ``fields`` minus ``omit``.
+
+    Relations in ``expandable_fields`` render as nested objects; when
+    ``expand`` is given, the ones it does not name render as id lists.
+    ``optional_fields`` are only rendered when ``fields`` names them.
+    """
+    expandable_fields = ()
+    optional_fields = ()
+
+    def __init__(self, *args, fields=None, omit=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        errors = {}
+        for param, names, allowed in (('fields', fields, self.fields),
+                                      ('omit', omit, self.fields),
+                                      ('expand', expand,
+                                       self.expandable_fields)):
+            unknown = [name for name in names or () if name not in allowed]
+            if unknown:
+                errors[param] = f'Unknown field(s): {", ".join(unknown)}.'
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        for name in list(self.fields):
+            if fields is not None and name not in fields or \
+                    name in (omit or ()) or \
+                    name in self.optional_fields and name not in (
+                        fields or ()):
+                self.fields.pop(name)
+        if expand is not None:
+            for name in self.expandable_fields:
+                if name in self.fields and name not in expand:
+                    self.fields[name] = serializers.PrimaryKeyRelatedField(
+                        many=True, read_only=True)
+
+
+@extend_schema_field(OpenApiTypes.OBJECT)
+class ImageVariantsField(serializers.Field):
+    """``Recipe.image_variants`` as variant -> format -> URL; empty until
+    the image worker has processed the latest upload."""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        storage = Recipe._meta.get_field('image').storage
+        request = self.context.get('request')
+        return {
+            variant: {
+                image_format: request.build_absolute_uri(storage.url(name))
+                if request else storage.url(name)
+                for image_format, name in formats.items()
+            }
+            for variant, formats in value.items()
+        }
+
+
+class RecipeImageField(serializers.ImageField):
+    """Image upload checked from its header only.
+
+    Format and dimensions are read without decoding any pixel, instead of
+    the full ``verify()`` pass of ``ImageField``; decoding is left to the
+    image worker, within the limits checked here. The file is renamed to
+    the extension of the format read, which its media type is served by.
+    """
+
+    def to_internal_value(self, data):
+        # FileField's checks, skipping ImageField's Pillow pass.
+        file_object = super(serializers.ImageField, self).to_internal_value(
+            data)
+        try:
+            image_format, _ = images.read_header(
+                file_object, settings.RECIPE_IMAGE_MAX_PIXELS,
+                settings.RECIPE_IMAGE_MAX_SIDE)
+        except images.ImageRejected as exc:
+            raise serializers.ValidationError(str(exc), code='invalid_image')
+        file_object.name = os.path.splitext(file_object.name)[0] + \
+            images.UPLOAD_FORMATS[image_format]
+        return file_object
+
+
+class RecipeAttrSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    recipe_count = serializers.IntegerField(read_only=True)
+    optional_fields = ('recipe_count',)
+
+    def validate_name(self, value):
+        instance = self.instance
+        if instance is not None and type(instance).objects.filter(
+            user_id=instance.user_id, name=value,
+        ).exclude(pk=instance.pk).exists():
+            raise serializers.ValidationError(
+                f'You already have one named "{value}".'
+            )
+        return value
+
+    def update(self, instance, validated_data):
+        # recipe_count moves by F() updates (see core.signals); saving the
+        # value loaded with the instance would undo any made since.
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
+
+
+class IngredientSerializer(RecipeAttrSerializer):
     class Meta:
         model = Ingredient
-        fields = ['id', 'name']
+        fields = ['id', 'name', 'recipe_count']
         read_only_fields = ['id']
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(RecipeAttrSerializer):
     class Meta:
         model = Tag
-        fields = ['id', 'name']
+        fields = ['id', 'name', 'recipe_count']
         read_only_fields = ['id']
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     tags = TagSerializer(many=True, required=False)
     ingredients = IngredientSerializer(many=True, required=False)
+    image_variants = ImageVariantsField()
+    expandable_fields = ('tags', 'ingredients')
 
     class Meta:
         model = Recipe
@@ -31,26 +167,24 @@ class RecipeSerializer(serializers.ModelSerializer):
             'id', 'title',
             'time_minutes', 'price',
             'link', 'tags',
-            'ingredients']
+            'ingredients', 'image_variants']
         read_only_fields = ['id']
 
+    def _get_or_create_attrs(self, model, attrs):
+        names = list(dict.fromkeys(attr['name'] for attr in attrs))
+        found = get_or_create_attrs(
+            model, self.context['request'].user, names)
+        return [found[name] for name in names]
+
     def _get_or_create_tags(self, tags, recipe):
-        auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
-            )
-            recipe.tags.add(tag_obj)
+        if tags:
+            recipe.tags.add(*self._get_or_create_attrs(Tag, tags))
 
     def _get_or_create_ingredients(self, ingredients, recipe):
-        auth_user = self.context['request'].user
-        for ingredient in ingredients:
-            ingredient_obj, created = Ingredient.objects.get_or_create(
-                user=auth_user,
-                **ingredient,
+        if ingredients:
+            recipe.ingredients.add(
+                *self._get_or_create_attrs(Ingredient, ingredients)
             )
-            recipe.ingredients.add(ingredient_obj)
 
     def create(self, validated_data):
         tags = validated_data.pop('tags', [])
@@ -60,18 +194,35 @@ class RecipeSerializer(serializers.ModelSerializer):
         self._get_or_create_ingredients(ingredients, recipe)
         return recipe
 
+    def _set_attrs(self, manager, model, attrs):
+        """Make ``manager`` hold exactly ``attrs``, touching only the
+        through rows that actually change."""
+        wanted = {
+            obj.pk: obj for obj in self._get_or_create_attrs(model, attrs)
+        } if attrs else {}
+        current = set(manager.values_list('pk', flat=True))
+        stale = current - wanted.keys()
+        if stale:
+            manager.remove(*stale)
+        added = [obj for pk, obj in wanted.items() if pk not in current]
+        if added:
+            manager.add(*added)
+
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('ingredients', None)
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            self._set_attrs(instance.tags, Tag, tags)
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
+            self._set_attrs(instance.ingredients, Ingredient, ingredients)
+        changed = [
+            attr for attr, value in validated_data.items()
+            if getattr(instance, attr) != value
+        ]
+        for attr in changed:
+            setattr(instance, attr, validated_data[attr])
+        if changed:
+            instance.save(update_fields=changed + ['updated_at'])
         return instance
 
 
@@ -81,12 +232,84 @@ class RecipeDetailSerializer(RecipeSerializer):
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
+    image = RecipeImageField()
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
-        fields = ['id', 'image']
+        fields = ['id', 'image', 'image_variants']
         read_only_fields = ['id']
-        extra_kwargs = {
-            'image': {
-                'required': 'True'
-            }
-        }
+
+
+class RecipeBulkOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=['create', 'update', 'delete'])
+    id = serializers.IntegerField(required=False)
+    data = serializers.DictField(required=False)
+
+    def validate(self, attrs):
+        if attrs['op'] != 'create' and 'id' not in attrs:
+            raise serializers.ValidationError(
+                {'id': 'This field is required.'})
+        if attrs['op'] != 'delete' and 'data' not in attrs:
+            raise serializers.ValidationError(
+                {'data': 'This field is required.'})
+        return attrs
+
+
+class RecipeBulkResultSerializer(serializers.Serializer):
+    op = serializers.CharField()
+    id = serializers.IntegerField()
+    status = serializers.IntegerField()
+
+
+class RecipeImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    format = serializers.ChoiceField(
+        choices=['ndjson', 'csv'],
+        required=False,
+        help_text='Defaults to csv for .csv files, ndjson otherwise',
+    )
+
+
+class RecipeImportResultSerializer(serializers.Serializer):
+    created = serializers.IntegerField()
+
+
+class FacetCountSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    count = serializers.IntegerField()
+
+
+class RecipeFacetsSerializer(serializers.Serializer):
+    tags = FacetCountSerializer(many=True)
+    ingredients = FacetCountSerializer(many=True)
+
+
+class CacheStatsSerializer(serializers.Serializer):
+    hits = serializers.IntegerField()
+    misses = serializers.IntegerField()
+
+
+class RecipeChangeSetSerializer(serializers.Serializer):
+    upserted = RecipeDetailSerializer(many=True)
+    deleted = serializers.ListField(child=serializers.IntegerField())
+
+
+class TagChangeSetSerializer(serializers.Serializer):
+    upserted = TagSerializer(many=True)
+    deleted = serializers.ListField(child=serializers.IntegerField())
+
+
+class IngredientChangeSetSerializer(serializers.Serializer):
+    upserted = IngredientSerializer(many=True)
+    deleted = serializers.ListField(child=serializers.IntegerField())
+
+
+class ChangesSerializer(serializers.Serializer):
+    recipes = RecipeChangeSetSerializer()
+    tags = TagChangeSetSerializer()
+    ingredients = IngredientChangeSetSerializer()
+    next = serializers.CharField(
+        help_text='Token to pass as `since` on the next call')
+    has_more = serializers.BooleanField()
@@ -0,0 +1,30 @@
+"""
+Signal handlers keeping the recipe API caches consistent
+"""
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+)
+from django.dispatch import receiver
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient
+)
+from recipe import cache
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+@receiver([post_save, post_delete], sender=Tag)
+@receiver([post_save, post_delete], sender=Ingredient)
+def invalidate_on_write(sender, instance, **kwargs):
+    cache.invalidate_user(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_on_relink(sender, instance, action, **kwargs):
+    if action.startswith('post_'):
+        cache.invalidate_user(instance.user_id)
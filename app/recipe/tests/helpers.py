@@ -0,0 +1,16 @@
+"""
+Fixtures shared by the recipe API tests
+"""
+from decimal import Decimal
+
+from core.models import Recipe
+
+
+def create_recipe(user, **params):
+    defaults = {
+        'title': 'Sample Recipe',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
@@ -0,0 +1,105 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Tag,
+    Ingredient,
+)
+from recipe import cache
+from recipe.filters import ILike
+
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        cache.get_cache().clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+
+    def names(self, url, **params):
+        res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [item['name'] for item in res.data]
+
+    def create_tags(self, *names, user=None):
+        Tag.objects.bulk_create(
+            [Tag(user=user or self.user, name=name) for name in names])
+
+    def test_prefix_case_insensitive(self):
+        self.create_tags('Vegan', 'vegetarian', 'Quick', 'Low veg')
+
+        self.assertEqual(
+            self.names(TAGS_URL, prefix='VEG'), ['Vegan', 'vegetarian'])
+
+    def test_prefix_wildcards_are_literal(self):
+        self.create_tags('100% rye', '1000 island', '1_2')
+
+        self.assertEqual(self.names(TAGS_URL, prefix='100%'), ['100% rye'])
+        self.assertEqual(self.names(TAGS_URL, prefix='1_'), ['1_2'])
+
+    def test_limit(self):
+        self.create_tags(*(f'Tag {i:02d}' for i in range(60)))
+
+        self.assertEqual(len(self.names(TAGS_URL, prefix='tag')), 10)
+        self.assertEqual(
+            self.names(TAGS_URL, prefix='tag', limit=3),
+            ['Tag 00', 'Tag 01', 'Tag 02'])
+        self.assertEqual(
+            len(self.names(TAGS_URL, prefix='tag', limit=500)), 50)
+
+        res = self.client.get(TAGS_URL, {'prefix': 'tag', 'limit': 0})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_scoped_to_user(self):
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123')
+        self.create_tags('Vegan', user=other)
+
+        self.assertEqual(self.names(TAGS_URL, prefix='veg'), [])
+
+    def test_fuzzy_best_match_first(self):
+        Ingredient.objects.bulk_create([
+            Ingredient(user=self.user, name=name)
+            for name in ('Tomato', 'Tomatillo', 'Potato', 'Basil')
+        ])
+
+        names = self.names(INGREDIENTS_URL, q='tomatoe')
+
+        self.assertEqual(names[0], 'Tomato')
+        self.assertNotIn('Basil', names)
+
+    def plan(self, queryset):
+        # Enough names that reading all of the user's costs more.
+        self.create_tags('Vegan', *(f'Tag {i}' for i in range(5000)))
+        with connection.cursor() as cursor:
+            # Fresh rows wait in the GIN pending list, which the planner
+            # costs as a full scan; autovacuum would have flushed it.
+            cursor.execute(
+                "SELECT gin_clean_pending_list('tag_user_name_trgm_idx')")
+            cursor.execute('ANALYZE core_tag')
+            return queryset.explain()
+
+    def test_fuzzy_lookup_uses_trigram_index(self):
+        plan = self.plan(Tag.objects.filter(
+            user=self.user, name__trigram_word_similar='veg'))
+
+        self.assertIn('tag_user_name_trgm_idx', plan)
+        self.assertRegex(plan, r'Index Cond: .*%>')
+
+    def test_prefix_lookup_uses_trigram_index(self):
+        plan = self.plan(Tag.objects.filter(
+            ILike(F('name'), 'veg%'), user=self.user,
+        ).order_by('name')[:10])
+
+        self.assertIn('tag_user_name_trgm_idx', plan)
+        self.assertRegex(plan, r'Index Cond: .*~~\*')
@@ -0,0 +1,220 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    ChangeLog,
+    MediaFile,
+    Recipe,
+    Tag,
+)
+from recipe.tests.helpers import create_recipe
+from recipe.views import RecipeViewSet
+
+BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def create_op(title, tags=()):
+    return {
+        'op': 'create',
+        'data': {
+            'title': title,
+            'time_minutes': 10,
+            'price': '2.50',
+            'tags': [{'name': name} for name in tags],
+        },
+    }
+
+
+class PublicBulkApiTests(TestCase):
+    def test_auth_required(self):
+        res = APIClient().post(BULK_URL, [], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateBulkApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+
+    def test_mixed_operations(self):
+        to_update = create_recipe(self.user, title='Old')
+        to_delete = create_recipe(self.user)
+        payload = [
+            create_op('New', tags=['Thai']),
+            {'op': 'update', 'id': to_update.id,
+             'data': {'title': 'Updated', 'tags': [{'name': 'Thai'}]}},
+            {'op': 'delete', 'id': to_delete.id},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(r['op'], r['status']) for r in res.data],
+            [('create', 201), ('update', 200), ('delete', 204)],
+        )
+        created = Recipe.objects.get(id=res.data[0]['id'])
+        self.assertEqual(created.user, self.user)
+        to_update.refresh_from_db()
+        self.assertEqual(to_update.title, 'Updated')
+        self.assertFalse(Recipe.objects.filter(id=to_delete.id).exists())
+        thai = Tag.objects.get(user=self.user, name='Thai')
+        self.assertIn(thai, created.tags.all())
+        self.assertIn(thai, to_update.tags.all())
+
+    def test_invalid_item_rejects_whole_batch(self):
+        recipe = create_recipe(self.user)
+        payload = [
+            create_op('Valid'),
+            {'op': 'update', 'id': recipe.id, 'data': {'price': 'abc'}},
+            {'op': 'delete', 'id': recipe.id + 1000},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('price', res.data[1]['data'])
+        self.assertIn('id', res.data[2])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+
+    def test_other_users_recipe_not_found(self):
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123')
+        recipe = create_recipe(other)
+
+        res = self.client.post(
+            BULK_URL, [{'op': 'delete', 'id': recipe.id}], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Recipe.objects.filter(id=recipe.id).exists())
+
+    def test_missing_fields_rejected(self):
+        payload = [{'op': 'update', 'data': {}}, {'op': 'create'}]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_shared_tags_resolved_once(self):
+        def query_count(count):
+            payload = [create_op(f'R{i}', tags=['Thai', 'Dinner'])
+                       for i in range(count)]
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(BULK_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            return len([q for q in ctx.captured_queries
+                        if 'FROM "core_tag"' in q['sql']])
+
+        # One SELECT plus one re-SELECT of the rows it had to insert.
+        self.assertEqual(query_count(10), 2)
+        self.assertEqual(query_count(10), 1)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def post_counting_queries(self, payload):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(BULK_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res, len(ctx.captured_queries)
+
+    def test_creates_batched(self):
+        # Tags exist already, so both batches resolve them the same way.
+        self.post_counting_queries([create_op('R', tags=['Thai', 'Dinner'])])
+
+        _, few = self.post_counting_queries(
+            [create_op(f'R{i}', tags=['Thai', 'Dinner']) for i in range(5)])
+        res, many = self.post_counting_queries(
+            [create_op(f'R{i}', tags=['Thai', 'Dinner']) for i in range(50)])
+
+        self.assertEqual(many, few)
+        created = Recipe.objects.filter(id__in=[r['id'] for r in res.data])
+        self.assertEqual(
+            [r.title for r in created.order_by('id')],
+            [f'R{i}' for i in range(50)])
+        self.assertEqual(
+            Tag.objects.get(user=self.user, name='Thai').recipe_count, 56)
+        self.assertEqual(ChangeLog.objects.filter(
+            object_type='recipe', object_id__in=created.values('id'),
+        ).count(), 50)
+        self.assertTrue(all(r.search_vector for r in created))
+
+    def test_updates_batched(self):
+        thai = Tag.objects.create(user=self.user, name='Thai')
+        Tag.objects.create(user=self.user, name='Dinner')
+        recipes = [create_recipe(self.user, title=f'R{i}') for i in range(50)]
+        for recipe in recipes:
+            recipe.tags.add(thai)
+
+        def update_ops(count):
+            return [
+                {'op': 'update', 'id': recipe.id,
+                 'data': {'title': f'New {recipe.id}',
+                          'tags': [{'name': 'Dinner'}]}}
+                for recipe in recipes[:count]
+            ]
+        _, few = self.post_counting_queries(update_ops(5))
+        _, many = self.post_counting_queries(update_ops(50))
+
+        self.assertEqual(many, few)
+        recipe = Recipe.objects.get(id=recipes[-1].id)
+        self.assertEqual(recipe.title, f'New {recipe.id}')
+        self.assertEqual(
+            [tag.name for tag in recipe.tags.all()], ['Dinner'])
+        thai.refresh_from_db()
+        self.assertEqual(thai.recipe_count, 0)
+        self.assertEqual(
+            Tag.objects.get(user=self.user, name='Dinner').recipe_count, 50)
+        self.assertGreater(recipe.updated_at, recipes[-1].updated_at)
+        res = self.client.get(
+            reverse('recipe:recipe-list'), {'search': f'New {recipe.id}'})
+        self.assertEqual(res.data[0]['id'], recipe.id)
+
+    def test_deletes_batched(self):
+        thai = Tag.objects.create(user=self.user, name='Thai')
+        recipes = [create_recipe(self.user, title=f'R{i}') for i in range(60)]
+        for recipe in recipes:
+            recipe.tags.add(thai)
+        Recipe.objects.filter(id__in=[r.id for r in recipes]).update(
+            image_variants={'thumb': {'jpeg': 'shared-thumb.jpg'}})
+        MediaFile.objects.adjust({'shared-thumb.jpg': 60})
+
+        def delete_ops(batch):
+            return [{'op': 'delete', 'id': recipe.id} for recipe in batch]
+        _, few = self.post_counting_queries(delete_ops(recipes[:5]))
+        _, many = self.post_counting_queries(delete_ops(recipes[5:55]))
+
+        self.assertEqual(many, few)
+        self.assertCountEqual(
+            Recipe.objects.filter(user=self.user), recipes[55:])
+        thai.refresh_from_db()
+        self.assertEqual(thai.recipe_count, 5)
+        self.assertEqual(
+            MediaFile.objects.get(name='shared-thumb.jpg').ref_count, 5)
+        self.assertEqual(ChangeLog.objects.filter(
+            object_type='recipe', action=ChangeLog.DELETE).count(), 55)
+
+    def test_unchanged_update_not_logged(self):
+        recipe = create_recipe(self.user, title='Same')
+        ChangeLog.objects.all().delete()
+
+        self.post_counting_queries(
+            [{'op': 'update', 'id': recipe.id, 'data': {'title': 'Same'}}])
+
+        self.assertFalse(ChangeLog.objects.exists())
+
+    def test_operation_limit_checked_before_validation(self):
+        payload = [{'op': 'nope'}] * (RecipeViewSet.bulk_max_operations + 1)
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('At most', res.data['detail'])
@@ -0,0 +1,104 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Tag,
+)
+from recipe import cache
+from recipe.tests.helpers import create_recipe
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+CACHE_STATS_URL = reverse('recipe:cache-stats')
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.get_cache().clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+
+    def test_repeated_list_served_from_cache(self):
+        create_recipe(self.user)
+
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            cached = self.client.get(RECIPE_URL)
+
+        self.assertEqual(cached['X-Cache'], 'HIT')
+        self.assertEqual(cached.data, res.data)
+
+    def test_recipe_write_invalidates(self):
+        create_recipe(self.user, title='First')
+        self.client.get(RECIPE_URL)
+
+        create_recipe(self.user, title='Second')
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(len(res.data), 2)
+
+    def test_tag_rename_invalidates_recipe_list(self):
+        recipe = create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Old')
+        recipe.tags.add(tag)
+        self.client.get(RECIPE_URL)
+
+        tag.name = 'New'
+        tag.save()
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.data[0]['tags'][0]['name'], 'New')
+
+    def test_relinking_tags_invalidates_tag_list(self):
+        recipe = create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+        self.assertEqual(res.data, [])
+
+        recipe.tags.add(tag)
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(len(res.data), 1)
+
+    def test_params_normalized(self):
+        tag1 = Tag.objects.create(user=self.user, name='t1')
+        tag2 = Tag.objects.create(user=self.user, name='t2')
+
+        self.client.get(RECIPE_URL, {'tags': f'{tag1.id},{tag2.id}'})
+        res = self.client.get(RECIPE_URL, {'tags': f'{tag2.id},{tag1.id}'})
+        self.assertEqual(res['X-Cache'], 'HIT')
+
+        res = self.client.get(RECIPE_URL, {'tags': f'{tag1.id}'})
+        self.assertEqual(res['X-Cache'], 'MISS')
+
+    def test_cache_isolated_per_user(self):
+        create_recipe(self.user)
+        self.client.get(RECIPE_URL)
+
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123')
+        self.client.force_authenticate(other)
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data, [])
+
+    def test_stats_exposed_to_staff(self):
+        self.client.get(RECIPE_URL)
+        self.client.get(RECIPE_URL)
+
+        res = self.client.get(CACHE_STATS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        res = self.client.get(CACHE_STATS_URL)
+        self.assertEqual(res.data, {'hits': 1, 'misses': 1})
@@ -0,0 +1,137 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+from recipe.tests.helpers import create_recipe
+
+CHANGES_URL = reverse('recipe:changes')
+
+
+class PublicChangesApiTests(TestCase):
+    def test_auth_required(self):
+        res = APIClient().get(CHANGES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateChangesApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+
+    def test_initial_sync_returns_everything(self):
+        recipe = create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+        Ingredient.objects.create(user=self.user, name='Salt')
+
+        res = self.client.get(CHANGES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['recipes']['upserted']), 1)
+        self.assertEqual(
+            res.data['recipes']['upserted'][0]['tags'],
+            [{'id': tag.id, 'name': 'Vegan'}],
+        )
+        self.assertEqual(res.data['tags']['upserted'][0]['name'], 'Vegan')
+        self.assertEqual(
+            res.data['ingredients']['upserted'][0]['name'], 'Salt')
+        self.assertFalse(res.data['has_more'])
+
+    def test_only_changes_since_token(self):
+        kept = create_recipe(self.user, title='Kept')
+        gone = create_recipe(self.user, title='Gone')
+        token = self.client.get(CHANGES_URL).data['next']
+
+        kept.title = 'Renamed'
+        kept.save()
+        gone_id = gone.id
+        gone.delete()
+        res = self.client.get(CHANGES_URL, {'since': token})
+
+        self.assertEqual(
+            [r['title'] for r in res.data['recipes']['upserted']],
+            ['Renamed'],
+        )
+        self.assertEqual(res.data['recipes']['deleted'], [gone_id])
+        self.assertEqual(res.data['tags'], {'upserted': [], 'deleted': []})
+
+        res = self.client.get(CHANGES_URL, {'since': res.data['next']})
+        self.assertEqual(res.data['recipes'], {'upserted': [], 'deleted': []})
+
+    def test_created_then_deleted_reported_as_deleted(self):
+        token = self.client.get(CHANGES_URL).data['next']
+        tag_id = Tag.objects.create(user=self.user, name='Brief').id
+        Tag.objects.filter(id=tag_id).delete()
+
+        res = self.client.get(CHANGES_URL, {'since': token})
+
+        self.assertEqual(res.data['tags'],
+                         {'upserted': [], 'deleted': [tag_id]})
+
+    def test_tag_delete_reports_linked_recipes(self):
+        recipe = create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+        recipe.refresh_from_db()
+        token = self.client.get(CHANGES_URL).data['next']
+
+        tag_id = tag.id
+        tag.delete()
+        res = self.client.get(CHANGES_URL, {'since': token})
+
+        self.assertEqual(res.data['tags']['deleted'], [tag_id])
+        upserted = res.data['recipes']['upserted']
+        self.assertEqual([r['id'] for r in upserted], [recipe.id])
+        self.assertEqual(upserted[0]['tags'], [])
+        self.assertGreater(
+            Recipe.objects.get(id=recipe.id).updated_at, recipe.updated_at)
+
+    def test_limit_pages_through_log(self):
+        for i in range(5):
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+
+        res = self.client.get(CHANGES_URL, {'limit': 3})
+        self.assertTrue(res.data['has_more'])
+        self.assertEqual(len(res.data['tags']['upserted']), 3)
+
+        res = self.client.get(
+            CHANGES_URL, {'since': res.data['next'], 'limit': 3})
+        self.assertFalse(res.data['has_more'])
+        self.assertEqual(len(res.data['tags']['upserted']), 2)
+
+    def test_other_users_changes_hidden(self):
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123')
+        create_recipe(other)
+
+        res = self.client.get(CHANGES_URL)
+
+        self.assertEqual(res.data['recipes'], {'upserted': [], 'deleted': []})
+        self.assertEqual(res.data['next'], '0')
+
+    def test_query_count_independent_of_collection_size(self):
+        for i in range(30):
+            create_recipe(self.user)
+        token = self.client.get(CHANGES_URL).data['next']
+        Tag.objects.create(user=self.user, name='New')
+
+        with self.assertNumQueries(2):
+            res = self.client.get(CHANGES_URL, {'since': token})
+
+        self.assertEqual(len(res.data['tags']['upserted']), 1)
+
+    def test_invalid_token_rejected(self):
+        res = self.client.get(CHANGES_URL, {'since': 'abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
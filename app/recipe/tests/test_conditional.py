@@ -0,0 +1,120 @@
+from django.contrib.auth import get_user_model
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Tag,
+)
+from recipe import cache
+from recipe.tests.helpers import create_recipe
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.get_cache().clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+
+    def test_list_sends_validators(self):
+        create_recipe(self.user)
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['ETag'].startswith('"'))
+        self.assertNotIn('Last-Modified', res)
+        self.assertIn('Authorization', res['Vary'])
+
+    @override_settings(RECIPE_CACHE_TIMEOUT=0)
+    def test_if_none_match_not_modified(self):
+        create_recipe(self.user)
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertFalse(res.content)
+
+    def test_change_invalidates_etag(self):
+        recipe = create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        recipe.tags.add(tag)
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_delete_invalidates_etag(self):
+        create_recipe(self.user)
+        recipe = create_recipe(self.user)
+        list_etag = self.client.get(RECIPE_URL)['ETag']
+        detail_etag = self.client.get(detail_url(recipe.id))['ETag']
+
+        recipe.delete()
+
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+        res = self.client.get(
+            detail_url(recipe.id), HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_detail_not_modified(self):
+        recipe = create_recipe(self.user)
+        etag = self.client.get(detail_url(recipe.id))['ETag']
+
+        res = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.patch(detail_url(recipe.id), {'title': 'New'})
+        res = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'New')
+
+    def test_detail_of_other_user_not_found(self):
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123')
+        recipe = create_recipe(other)
+
+        res = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH='*')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tag_rename_changes_tag_list_etag(self):
+        tag = Tag.objects.create(user=self.user, name='Old')
+        etag = self.client.get(TAGS_URL)['ETag']
+
+        tag.name = 'New'
+        tag.save()
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_cache_hit_answers_not_modified(self):
+        create_recipe(self.user)
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['X-Cache'], 'HIT')
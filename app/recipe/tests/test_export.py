@@ -0,0 +1,96 @@
+import csv
+import io
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Tag,
+    Ingredient
+)
+from recipe.views import RecipeViewSet
+from recipe.tests.helpers import create_recipe
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+class PublicExportApiTests(TestCase):
+    def test_auth_required(self):
+        res = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateExportApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+
+    def export(self, **params):
+        res = self.client.get(EXPORT_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        return res, b''.join(res.streaming_content).decode()
+
+    def test_ndjson_export(self):
+        first = create_recipe(self.user, title='First', description='One')
+        first.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        create_recipe(self.user, title='Second')
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123')
+        create_recipe(other, title='Hidden')
+
+        res, body = self.export()
+
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([r['title'] for r in rows], ['First', 'Second'])
+        self.assertEqual(rows[0]['description'], 'One')
+        self.assertEqual(rows[0]['price'], '5.25')
+        self.assertEqual(rows[0]['tags'][0]['name'], 'Vegan')
+
+    def test_csv_export(self):
+        recipe = create_recipe(self.user, title='Curry, red')
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Rice'),
+            Ingredient.objects.create(user=self.user, name='Chili'),
+        )
+
+        res, body = self.export(format='csv')
+
+        self.assertEqual(res['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('recipes.csv', res['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], 'Curry, red')
+        self.assertEqual(rows[0]['ingredients'], 'Rice|Chili')
+        self.assertEqual(rows[0]['tags'], '')
+
+    def test_empty_csv_has_header(self):
+        _, body = self.export(format='csv')
+
+        self.assertTrue(body.startswith('id,title,'))
+
+    def test_exported_in_chunks(self):
+        for i in range(5):
+            create_recipe(self.user, title=f'Recipe {i}')
+
+        with patch.object(RecipeViewSet, 'export_chunk_size', 2):
+            # One cursor, then the tags and ingredients of each chunk.
+            with self.assertNumQueries(1 + 3 * 2):
+                _, body = self.export()
+
+        self.assertEqual(len(body.splitlines()), 5)
+
+    def test_unknown_format(self):
+        res = self.client.get(EXPORT_URL, {'format': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Tag,
+    Ingredient,
+)
+from recipe import cache
+from recipe.tests.helpers import create_recipe
+
+FACETS_URL = reverse('recipe:recipe-facets')
+
+
+class RecipeFacetsTests(TestCase):
+    def setUp(self):
+        cache.get_cache().clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.quick = Tag.objects.create(user=self.user, name='Quick')
+        self.rice = Ingredient.objects.create(user=self.user, name='Rice')
+        self.salad = create_recipe(self.user, title='Salad')
+        self.salad.tags.add(self.vegan, self.quick)
+        self.curry = create_recipe(self.user, title='Curry')
+        self.curry.tags.add(self.vegan)
+        self.curry.ingredients.add(self.rice)
+        create_recipe(self.user, title='Plain')
+
+    def test_counts_per_tag_and_ingredient(self):
+        res = self.client.get(FACETS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {
+            'tags': [
+                {'id': self.vegan.id, 'name': 'Vegan', 'count': 2},
+                {'id': self.quick.id, 'name': 'Quick', 'count': 1},
+            ],
+            'ingredients': [
+                {'id': self.rice.id, 'name': 'Rice', 'count': 1},
+            ],
+        })
+
+    def test_counts_follow_filters(self):
+        res = self.client.get(FACETS_URL, {'tags': str(self.quick.id)})
+
+        self.assertEqual(res.data['tags'], [
+            {'id': self.quick.id, 'name': 'Quick', 'count': 1},
+            {'id': self.vegan.id, 'name': 'Vegan', 'count': 1},
+        ])
+        self.assertEqual(res.data['ingredients'], [])
+
+        res = self.client.get(FACETS_URL, {'search': 'curry'})
+        self.assertEqual(
+            [facet['count'] for facet in res.data['tags']], [1])
+
+    def test_scoped_to_user(self):
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123')
+        self.client.force_authenticate(other)
+
+        res = self.client.get(FACETS_URL)
+
+        self.assertEqual(res.data, {'tags': [], 'ingredients': []})
+
+    def test_single_query_then_cached(self):
+        with self.assertNumQueries(1):
+            res = self.client.get(FACETS_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+
+        with self.assertNumQueries(0):
+            res = self.client.get(FACETS_URL)
+        self.assertEqual(res['X-Cache'], 'HIT')
+
+        self.curry.tags.add(self.quick)
+        res = self.client.get(FACETS_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['tags'][0]['count'], 2)
@@ -0,0 +1,96 @@
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient
+)
+from recipe import cache
+from recipe.fast_serializers import FastReadSerializer
+from recipe.serializers import RecipeSerializer
+from recipe.views import (
+    BaseRecipeAttrViewSet,
+    RecipeViewSet,
+)
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class FastReadParityTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+        tags = [Tag.objects.create(user=self.user, name=name)
+                for name in ('Vegan', 'Thaï', 'Dinner')]
+        ingredients = [Ingredient.objects.create(user=self.user, name=name)
+                       for name in ('Salt', 'Lime')]
+        for i, price in enumerate(('5.00', '0.50', '999.99')):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe “{i}”',
+                time_minutes=i,
+                price=Decimal(price),
+                link='' if i else 'https://example.com',
+            )
+            recipe.tags.add(*tags[i:])
+            recipe.ingredients.add(*ingredients[:i])
+        Tag.objects.create(user=self.user, name='Unused')
+        self.tags = tags
+
+    def get_both(self, url, view, params):
+        cache.get_cache().clear()
+        fast = self.client.get(url, params)
+        cache.get_cache().clear()
+        with patch.object(view, 'fast_read_actions', ()):
+            regular = self.client.get(url, params)
+        return fast, regular
+
+    def test_recipe_list_identical(self):
+        for params in ({}, {'fields': 'title,price'}, {'omit': 'tags'},
+                       {'expand': 'ingredients'}, {'expand': ''},
+                       {'limit': 2}, {'tags': f'{self.tags[0].id}'}):
+            fast, regular = self.get_both(RECIPE_URL, RecipeViewSet, params)
+            self.assertEqual(fast.status_code, regular.status_code)
+            self.assertEqual(fast.content, regular.content, params)
+
+    def test_tag_list_identical(self):
+        for params in ({}, {'assigned_only': 1}, {'fields': 'name'}):
+            fast, regular = self.get_both(
+                TAGS_URL, BaseRecipeAttrViewSet, params)
+            self.assertEqual(fast.content, regular.content, params)
+
+    def test_serializer_data_identical(self):
+        queryset = Recipe.objects.order_by('id')
+        regular = RecipeSerializer(
+            queryset.prefetch_related('tags', 'ingredients'), many=True)
+        fast = FastReadSerializer(
+            RecipeSerializer,
+            FastReadSerializer(RecipeSerializer).get_values_queryset(
+                queryset),
+            many=True,
+        )
+
+        for fast_row, regular_row in zip(fast.data, regular.data):
+            regular_row = dict(regular_row)
+            for name in ('tags', 'ingredients'):
+                regular_row[name] = sorted(
+                    [dict(item) for item in regular_row[name]],
+                    key=lambda item: item['id'])
+            self.assertEqual(fast_row, regular_row)
+
+    def test_fast_path_skips_model_instances(self):
+        cache.get_cache().clear()
+        with patch.object(Recipe, '__init__') as init:
+            self.client.get(RECIPE_URL)
+
+        init.assert_not_called()
@@ -0,0 +1,151 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    ChangeLog,
+    Recipe,
+    Tag,
+)
+
+IMPORT_URL = reverse('recipe:recipe-import-recipes')
+EXPORT_URL = reverse('recipe:recipe-export')
+RECIPE_URL = reverse('recipe:recipe-list')
+
+NDJSON = b'''{"title": "Curry", "time_minutes": 30, "price": "7.50", \
+"tags": [{"name": "Thai"}, {"name": "Dinner"}], "ingredients": ["Rice"]}
+
+{"title": "Soup\\ttab", "time_minutes": 5, "price": 2, \
+"description": "a\\nb", "tags": ["Thai"]}
+'''
+
+
+class PrivateImportApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+
+    def upload(self, content, name='recipes.ndjson', **data):
+        return self.client.post(
+            IMPORT_URL,
+            {'file': SimpleUploadedFile(name, content), **data},
+            format='multipart',
+        )
+
+    def test_import_ndjson(self):
+        thai = Tag.objects.create(user=self.user, name='Thai')
+
+        res = self.upload(NDJSON)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data, {'created': 2})
+        curry = Recipe.objects.get(user=self.user, title='Curry')
+        self.assertEqual(curry.price, Decimal('7.50'))
+        self.assertEqual(
+            set(curry.tags.values_list('name', flat=True)),
+            {'Thai', 'Dinner'},
+        )
+        self.assertEqual(curry.ingredients.get().name, 'Rice')
+        soup = Recipe.objects.get(user=self.user, title='Soup\ttab')
+        self.assertEqual(soup.description, 'a\nb')
+        self.assertEqual(list(soup.tags.all()), [thai])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_import_visible_to_reads_and_sync(self):
+        self.client.get(RECIPE_URL)
+
+        self.upload(NDJSON)
+
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(len(res.data), 2)
+        logged = ChangeLog.objects.filter(user=self.user)
+        self.assertEqual(logged.filter(object_type='recipe').count(), 2)
+        self.assertEqual(logged.filter(object_type='tag').count(), 2)
+
+    def test_csv_round_trip(self):
+        self.upload(NDJSON)
+        res = self.client.get(EXPORT_URL, {'format': 'csv'})
+        exported = b''.join(res.streaming_content)
+        Recipe.objects.all().delete()
+
+        res = self.upload(exported, name='recipes.csv')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        curry = Recipe.objects.get(user=self.user, title='Curry')
+        self.assertEqual(curry.tags.count(), 2)
+        self.assertEqual(curry.ingredients.get().name, 'Rice')
+
+    def test_invalid_row_rejects_import(self):
+        content = NDJSON + b'{"title": "Bad", "time_minutes": 1}\n'
+
+        res = self.upload(content)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['line'], 4)
+        self.assertIn('price', res.data['errors'])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_values_coerced_like_the_api(self):
+        content = (
+            b'{"title": " Stew ", "time_minutes": "45", "price": 3}\n'
+            b'{"title": "", "time_minutes": 1.5, "price": "1.005"}\n'
+        )
+
+        res = self.upload(content)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['line'], 2)
+        self.assertEqual(
+            set(res.data['errors']), {'title', 'time_minutes', 'price'})
+
+        res = self.upload(content.splitlines()[0])
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        stew = Recipe.objects.get(user=self.user)
+        self.assertEqual(
+            (stew.title, stew.time_minutes, stew.price),
+            ('Stew', 45, Decimal('3.00')))
+
+    def test_malformed_json(self):
+        res = self.upload(b'{"title": ', format='ndjson')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['line'], 1)
+
+    def test_invalid_utf8_csv(self):
+        content = (b'title,time_minutes,price\n'
+                   b'Soup,5,1.00\n'
+                   b'Caf\xe9,5,1.00\n')
+
+        res = self.upload(content, name='recipes.csv')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['line'], 3)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_attr_names_coerced_like_the_api(self):
+        res = self.upload(
+            b'{"title": "Stew", "time_minutes": 5, "price": 1, '
+            b'"tags": [" x", "x", {"name": "y "}]}\n')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            set(Tag.objects.filter(user=self.user).values_list(
+                'name', flat=True)), {'x', 'y'})
+
+        res = self.upload(
+            b'{"title": "Stew", "time_minutes": 5, "price": 1}\n'
+            b'{"title": "Soup", "time_minutes": 5, "price": 1, '
+            b'"ingredients": ["a\\u0000b"]}\n')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['line'], 2)
+        self.assertIn('ingredients', res.data['errors'])
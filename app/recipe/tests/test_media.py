@@ -0,0 +1,94 @@
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipe.tests.helpers import create_recipe
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def media_url(name):
+    return reverse('recipe:media', args=[name])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_ACCEL_REDIRECT=True)
+class RecipeMediaTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(self.user)
+        self.recipe.image.save('photo.jpg', ContentFile(b'jpeg'))
+
+    def test_owner_redirected_to_internal_location(self):
+        name = self.recipe.image.name
+
+        res = self.client.get(media_url(name))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['X-Accel-Redirect'], f'/protected-media/{name}')
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res.content, b'')
+        self.assertEqual(
+            res['Cache-Control'], 'private, max-age=31536000, immutable')
+
+    def test_variant_served(self):
+        self.recipe.image_variants = {
+            'thumb': {'webp': 'uploads/recipe/thumb.webp'}}
+        self.recipe.save(update_fields=['image_variants'])
+
+        res = self.client.get(media_url('uploads/recipe/thumb.webp'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'image/webp')
+        # Not content-addressed, so revalidated.
+        self.assertEqual(res['Cache-Control'], 'private, no-cache')
+
+    def test_shared_file_served_to_each_owner(self):
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123')
+        other_recipe = create_recipe(other)
+        other_recipe.image.save('same.jpg', ContentFile(b'jpeg'))
+        self.client.force_authenticate(other)
+
+        res = self.client.get(media_url(self.recipe.image.name))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_other_users_media_not_found(self):
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123')
+        self.client.force_authenticate(other)
+
+        res = self.client.get(media_url(self.recipe.image.name))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('X-Accel-Redirect', res)
+
+    def test_auth_required(self):
+        res = APIClient().get(media_url(self.recipe.image.name))
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT=False)
+    def test_served_by_django_without_proxy(self):
+        res = self.client.get(media_url(self.recipe.image.name))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('X-Accel-Redirect', res)
+        self.assertEqual(b''.join(res.streaming_content), b'jpeg')
@@ -0,0 +1,78 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipe import cache
+from recipe.tests.helpers import create_recipe
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+class RangeAndOrderingTests(TestCase):
+    def setUp(self):
+        cache.get_cache().clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+
+    def ids(self, **params):
+        res = self.client.get(RECIPE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in res.data]
+
+    def test_price_and_time_bounds(self):
+        quick_cheap = create_recipe(
+            self.user, price=Decimal('4.00'), time_minutes=20)
+        create_recipe(self.user, price=Decimal('12.00'), time_minutes=20)
+        create_recipe(self.user, price=Decimal('4.00'), time_minutes=45)
+        create_recipe(self.user, price=Decimal('2.00'), time_minutes=10)
+
+        self.assertEqual(
+            self.ids(min_price='3', max_price='10', max_time=30),
+            [quick_cheap.id])
+
+    def test_invalid_bounds_rejected(self):
+        res = self.client.get(
+            RECIPE_URL, {'min_price': 'cheap', 'max_time': '-1'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(res.data), {'min_price', 'max_time'})
+
+    def test_ordering_with_id_tie_break(self):
+        r1 = create_recipe(self.user, price=Decimal('8.00'))
+        r2 = create_recipe(self.user, price=Decimal('3.00'))
+        r3 = create_recipe(self.user, price=Decimal('8.00'))
+
+        self.assertEqual(self.ids(ordering='price'), [r2.id, r1.id, r3.id])
+        self.assertEqual(self.ids(ordering='-price'), [r3.id, r1.id, r2.id])
+
+    def test_unknown_ordering_rejected(self):
+        res = self.client.get(RECIPE_URL, {'ordering': 'title'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ordering', res.data)
+
+    def test_keyset_pages_follow_sort_key(self):
+        recipes = [
+            create_recipe(self.user, time_minutes=minutes)
+            for minutes in (30, 10, 20, 10, 40)
+        ]
+        expected = [r.id for r in sorted(
+            recipes, key=lambda r: (r.time_minutes, r.id))]
+
+        seen = []
+        params = {'ordering': 'time_minutes', 'limit': 2, 'fields': 'id,title'}
+        url = RECIPE_URL
+        while url:
+            res = self.client.get(url, params)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            seen.extend(r['id'] for r in res.data['results'])
+            url, params = res.data['next'], None
+
+        self.assertEqual(seen, expected)
@@ -0,0 +1,137 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+)
+from recipe.tests.helpers import create_recipe
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+        self.recipes = [
+            create_recipe(self.user, title=f'R{i}') for i in range(5)
+        ]
+
+    def test_unpaginated_without_params(self):
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(res.data, list)
+        self.assertEqual(len(res.data), 5)
+
+    def test_limit_returns_first_page(self):
+        res = self.client.get(RECIPE_URL, {'limit': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [r['id'] for r in res.data['results']]
+        self.assertEqual(ids, [self.recipes[4].id, self.recipes[3].id])
+        self.assertIsNotNone(res.data['next'])
+        self.assertIsNone(res.data['previous'])
+
+    def test_follow_next_and_previous_links(self):
+        seen = []
+        url = f'{RECIPE_URL}?limit=2'
+        while url:
+            res = self.client.get(url)
+            seen.extend(r['id'] for r in res.data['results'])
+            last = res.data
+            url = res.data['next']
+
+        expected = [r.id for r in reversed(self.recipes)]
+        self.assertEqual(seen, expected)
+
+        res = self.client.get(last['previous'])
+        ids = [r['id'] for r in res.data['results']]
+        self.assertEqual(ids, expected[2:4])
+
+    def test_page_seeks_by_id_not_offset(self):
+        res = self.client.get(RECIPE_URL, {'limit': 2})
+        with self.assertNumQueries(3) as ctx:
+            self.client.get(res.data['next'])
+
+        recipe_sql = next(
+            q['sql'] for q in ctx.captured_queries
+            if '"core_recipe"."title"' in q['sql']
+        )
+        self.assertIn('"core_recipe"."id" <', recipe_sql)
+        self.assertNotIn('OFFSET', recipe_sql)
+
+    def test_limit_capped(self):
+        res = self.client.get(RECIPE_URL, {'limit': 100000})
+
+        self.assertEqual(len(res.data['results']), 5)
+        self.assertIsNone(res.data['next'])
+
+    def test_paginate_tags(self):
+        tags = [Tag.objects.create(user=self.user, name=f't{i}')
+                for i in range(3)]
+
+        res = self.client.get(TAGS_URL, {'limit': 2})
+        ids = [t['id'] for t in res.data['results']]
+        self.assertEqual(ids, [tags[2].id, tags[1].id])
+
+        res = self.client.get(res.data['next'])
+        ids = [t['id'] for t in res.data['results']]
+        self.assertEqual(ids, [tags[0].id])
+        self.assertIsNone(res.data['next'])
+
+    def walk(self, url, params):
+        seen, pages = [], []
+        while url:
+            res = self.client.get(url, params)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            seen.extend(item['id'] for item in res.data['results'])
+            pages.append(res.data)
+            self.assertLess(len(pages), 10, 'Pagination does not end.')
+            url, params = res.data['next'], None
+        return seen, pages
+
+    def test_ties_past_offset_cutoff(self):
+        Recipe.objects.bulk_create([
+            Recipe(user=self.user, title=f'T{i}', time_minutes=5,
+                   price=Decimal('9.99'))
+            for i in range(1500)
+        ])
+        expected = list(Recipe.objects.filter(user=self.user).order_by(
+            '-price', '-id').values_list('id', flat=True))
+
+        seen, pages = self.walk(
+            RECIPE_URL, {'ordering': '-price', 'limit': 250, 'fields': 'id'})
+
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(pages), 7)
+        res = self.client.get(pages[-1]['previous'])
+        self.assertEqual(
+            [r['id'] for r in res.data['results']], expected[1250:1500])
+
+    def test_tags_ordered_by_count_with_ties(self):
+        tags = [Tag.objects.create(user=self.user, name=f't{i}')
+                for i in range(4)]
+        self.recipes[0].tags.add(tags[1], tags[3])
+
+        seen, _ = self.walk(
+            TAGS_URL, {'ordering': '-recipe_count', 'limit': 1})
+
+        self.assertEqual(
+            seen, [tags[3].id, tags[1].id, tags[2].id, tags[0].id])
+
+    def test_malformed_cursor_not_found(self):
+        # Position ["a"], where an id is expected.
+        res = self.client.get(TAGS_URL, {'cursor': 'cD1bImEiXQ=='})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,85 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient
+)
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+# Queries each endpoint may issue, independent of how many recipes,
+# tags or ingredients the user owns.
+QUERY_BUDGET = {
+    'list': 3,
+    'retrieve': 3,
+}
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def create_recipes(user, count, attrs_per_recipe=3):
+    recipes = []
+    for i in range(count):
+        recipe = Recipe.objects.create(
+            user=user,
+            title=f'Recipe {i}',
+            time_minutes=10,
+            price=Decimal('5.00'),
+        )
+        for j in range(attrs_per_recipe):
+            name = f'{recipe.id}-{j}'
+            recipe.tags.add(Tag.objects.create(user=user, name=name))
+            recipe.ingredients.add(
+                Ingredient.objects.create(user=user, name=name))
+        recipes.append(recipe)
+    return recipes
+
+
+class RecipeQueryBudgetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+
+    def test_list_query_count_constant(self):
+        create_recipes(self.user, 2)
+        with self.assertNumQueries(QUERY_BUDGET['list']):
+            res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        create_recipes(self.user, 20)
+        with self.assertNumQueries(QUERY_BUDGET['list']):
+            res = self.client.get(RECIPE_URL)
+        self.assertEqual(len(res.data), 22)
+
+    def test_retrieve_query_count(self):
+        recipe = create_recipes(self.user, 1, attrs_per_recipe=10)[0]
+        with self.assertNumQueries(QUERY_BUDGET['retrieve']):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['tags']), 10)
+        self.assertEqual(len(res.data['ingredients']), 10)
+
+    def test_list_defers_unused_columns(self):
+        create_recipes(self.user, 1)
+        with self.assertNumQueries(QUERY_BUDGET['list']) as ctx:
+            self.client.get(RECIPE_URL)
+
+        recipe_sql = next(
+            q['sql'] for q in ctx.captured_queries
+            if '"core_recipe"."title"' in q['sql']
+        )
+        self.assertNotIn('"description"', recipe_sql)
+        self.assertNotIn('"image"', recipe_sql)
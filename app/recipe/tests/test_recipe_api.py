@@ -1,10 +1,19 @@
 from decimal import Decimal
+import io
+import struct
 import tempfile
 import os
+import zlib
 from PIL import Image
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
@@ -24,6 +33,13 @@ from recipe.serializers import (
 RECIPE_URL = reverse('recipe:recipe-list')
 
 
+def png_header(width, height):
+    """A PNG declaring ``width`` x ``height`` pixels, without pixel data."""
+    ihdr = b'IHDR' + struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + ihdr
+            + struct.pack('>I', zlib.crc32(ihdr)))
+
+
 def detail_url(recipe_id):
     return reverse('recipe:recipe-detail', args=[recipe_id])
 
@@ -158,6 +174,22 @@ class PrivateRecipeAPITests(TestCase):
             self.assertEqual(getattr(recipe, k), v)
         self.assertEqual(recipe.user, self.user)
 
+    def test_partial_update_saves_changed_fields_only(self):
+        recipe = create_recipe(user=self.user, title='Old title')
+        payload = {'title': 'New title', 'time_minutes': recipe.time_minutes}
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(detail_url(recipe.id), payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        updates = [q['sql'] for q in ctx.captured_queries
+                   if q['sql'].startswith('UPDATE')
+                   and '"search_vector" =' not in q['sql']]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"title"', updates[0])
+        self.assertNotIn('"time_minutes"', updates[0])
+        self.assertNotIn('"description"', updates[0])
+
     def test_update_user_returns_error(self):
         new_user = create_user(email='user2@example.com', password='password')
         recipe = create_recipe(user=self.user)
@@ -231,6 +263,43 @@ class PrivateRecipeAPITests(TestCase):
                 name=tag['name'], user=self.user).exists()
             self.assertTrue(exists)
 
+    def test_create_recipe_attr_queries_constant(self):
+        def payload(count):
+            return {
+                'title': 'Recipe',
+                'time_minutes': 10,
+                'price': Decimal('2.5'),
+                'tags': [{'name': f'tag{i}'} for i in range(count)],
+                'ingredients': [{'name': f'ing{i}'} for i in range(count)],
+            }
+
+        query_counts = []
+        for count in (2, 30):
+            Tag.objects.create(user=self.user, name=f'tag{count}-old')
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(
+                    RECIPE_URL, payload(count), format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            query_counts.append(len(ctx.captured_queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 30)
+        self.assertEqual(recipe.ingredients.count(), 30)
+
+    def test_create_recipe_duplicate_tag_names(self):
+        payload = {
+            'title': 'Recipe',
+            'time_minutes': 10,
+            'price': Decimal('2.5'),
+            'tags': [{'name': 'Thai'}, {'name': 'Thai'}],
+        }
+        res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data['tags']), 1)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
     def test_create_tag_on_update(self):
         recipe = create_recipe(user=self.user)
         payload = {
@@ -258,6 +327,45 @@ class PrivateRecipeAPITests(TestCase):
         self.assertIn(tag_dinner, recipe.tags.all())
         self.assertNotIn(tag_indian, recipe.tags.all())
 
+    def test_update_tags_touches_only_changed_rows(self):
+        recipe = create_recipe(user=self.user)
+        tag_keep = Tag.objects.create(user=self.user, name='Keep')
+        tag_drop = Tag.objects.create(user=self.user, name='Drop')
+        recipe.tags.add(tag_keep, tag_drop)
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=f'ing{i}')
+            for i in range(40)
+        ]
+        recipe.ingredients.add(*ingredients)
+
+        payload = {
+            'tags': [{'name': 'Keep'}, {'name': 'New'}],
+            'ingredients': [{'name': i.name} for i in ingredients],
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(
+                detail_url(recipe.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        writes = [q['sql'] for q in ctx.captured_queries
+                  if q['sql'].startswith(('INSERT', 'DELETE', 'UPDATE'))]
+        self.assertFalse([sql for sql in writes
+                          if sql.startswith(('INSERT', 'DELETE'))
+                          and 'core_recipe_ingredients' in sql])
+        # Relinking only bumps the recipe's updated_at and search vector
+        # and the relinked tags' recipe counts.
+        for sql in writes:
+            if sql.startswith('UPDATE "core_tag"'):
+                self.assertRegex(
+                    sql, r'^UPDATE "core_tag" SET "recipe_count" = ')
+            elif sql.startswith('UPDATE'):
+                self.assertRegex(
+                    sql, r'^UPDATE "core_recipe" SET "updated_at" = \S+, '
+                         r'"search_vector" = ')
+        self.assertEqual(
+            set(recipe.tags.values_list('name', flat=True)), {'Keep', 'New'})
+        self.assertEqual(recipe.ingredients.count(), 40)
+
     def test_clear_recipe_tags(self):
         recipe = create_recipe(user=self.user)
         tag_indian = Tag.objects.create(user=self.user, name='Indian')
@@ -393,6 +501,62 @@ class PrivateRecipeAPITests(TestCase):
         self.assertIn(s2.data, res.data)
         self.assertNotIn(s3.data, res.data)
 
+    def test_filter_by_tags_returns_recipe_once(self):
+        recipe = create_recipe(user=self.user)
+        tag1 = Tag.objects.create(user=self.user, name='t1')
+        tag2 = Tag.objects.create(user=self.user, name='t2')
+        recipe.tags.add(tag1, tag2)
+
+        params = {'tags': f'{tag1.id},{tag2.id}'}
+        res = self.client.get(RECIPE_URL, params)
+
+        self.assertEqual(len(res.data), 1)
+
+    def test_filter_match_all(self):
+        recipe1 = create_recipe(user=self.user, title='R1')
+        recipe2 = create_recipe(user=self.user, title='R2')
+        tag1 = Tag.objects.create(user=self.user, name='t1')
+        tag2 = Tag.objects.create(user=self.user, name='t2')
+        in1 = Ingredient.objects.create(user=self.user, name='in1')
+        recipe1.tags.add(tag1, tag2)
+        recipe1.ingredients.add(in1)
+        recipe2.tags.add(tag1)
+        recipe2.ingredients.add(in1)
+
+        params = {
+            'tags': f'{tag1.id},{tag2.id}',
+            'ingredients': f'{in1.id}',
+            'match': 'all',
+        }
+        res = self.client.get(RECIPE_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in res.data], [recipe1.id])
+
+    def test_filter_invalid_params(self):
+        for params in ({'tags': '1,abc'}, {'match': 'some'}):
+            res = self.client.get(RECIPE_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_plan_has_no_distinct(self):
+        recipe = create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='t1')
+        recipe.tags.add(tag)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(RECIPE_URL, {'tags': f'{tag.id}'})
+        sql = next(
+            q['sql'] for q in ctx.captured_queries
+            if '"core_recipe"."title"' in q['sql']
+        )
+        self.assertIn('EXISTS', sql)
+        self.assertNotIn('DISTINCT', sql)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN {sql}')
+            plan = [row[0] for row in cursor.fetchall()]
+        self.assertFalse([node for node in plan if 'Unique' in node])
+
 
 class ImageUploadTests(TestCase):
     def setUp(self):
@@ -420,8 +584,58 @@ class ImageUploadTests(TestCase):
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    def test_upload_image_named_by_its_format(self):
+        url = image_upload_url(self.recipe.id)
+        buffer = io.BytesIO()
+        Image.new('RGB', (10, 10)).save(buffer, format='PNG')
+        image = SimpleUploadedFile('x.html', buffer.getvalue())
+
+        res = self.client.post(url, {'image': image}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image.name.endswith('.png'))
+        res = self.client.get(
+            reverse('recipe:media', args=[self.recipe.image.name]))
+        self.assertEqual(res['Content-Type'], 'image/png')
+
     def test_upload_image_bad_request(self):
         url = image_upload_url(self.recipe.id)
         payload = {'image': 'image_file'}
         res = self.client.post(url, payload=payload, format='multipart')
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(RECIPE_IMAGE_MAX_SIZE=1000)
+    def test_upload_image_too_large(self):
+        url = image_upload_url(self.recipe.id)
+        # Refused by declared length, then while streaming the file.
+        for size in (200 * 1024, 5000):
+            image = SimpleUploadedFile('big.jpg', b'\xff' * size)
+            res = self.client.post(url, {'image': image}, format='multipart')
+
+            self.assertEqual(
+                res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    def test_upload_image_rejected_from_header(self):
+        url = image_upload_url(self.recipe.id)
+        # Decoded, a 50000x50000 RGB bomb would take 7.5 GB.
+        for name, content in (('bomb.png', png_header(50000, 50000)),
+                              ('wide.png', png_header(20000, 10))):
+            image = SimpleUploadedFile(name, content)
+            res = self.client.post(url, {'image': image}, format='multipart')
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('image', res.data)
+
+    def test_upload_image_unsupported_format(self):
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.gif') as image_file:
+            Image.new('RGB', (10, 10)).save(image_file, format='GIF')
+            image_file.seek(0)
+            res = self.client.post(
+                url, {'image': image_file}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('GIF', str(res.data['image']))
@@ -0,0 +1,145 @@
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchQuery
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+from recipe import cache
+from recipe.tests.helpers import create_recipe
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class RecipeSearchTests(TestCase):
+    def setUp(self):
+        cache.get_cache().clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+
+    def search(self, query, **params):
+        res = self.client.get(RECIPE_URL, {'search': query, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in res.data]
+
+    def test_matches_title_description_and_names(self):
+        by_title = create_recipe(self.user, title='Lemon tart')
+        by_description = create_recipe(
+            self.user, title='Cake', description='Zest two lemons')
+        by_tag = create_recipe(self.user, title='Drink')
+        by_tag.tags.add(Tag.objects.create(user=self.user, name='Lemons'))
+        by_ingredient = create_recipe(self.user, title='Salad')
+        by_ingredient.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Lemon'))
+        create_recipe(self.user, title='Curry')
+
+        self.assertCountEqual(self.search('lemon'), [
+            by_title.id, by_description.id, by_tag.id, by_ingredient.id,
+        ])
+
+    def test_ranked_by_field_weight(self):
+        in_description = create_recipe(
+            self.user, title='Pie', description='With apple')
+        in_title = create_recipe(self.user, title='Apple crumble')
+
+        self.assertEqual(
+            self.search('apple'), [in_title.id, in_description.id])
+
+    def test_web_search_syntax(self):
+        pasta = create_recipe(self.user, title='Tomato pasta')
+        create_recipe(self.user, title='Tomato soup')
+
+        self.assertEqual(self.search('tomato -soup'), [pasta.id])
+
+    def test_scoped_to_user(self):
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123')
+        create_recipe(other, title='Lemon tart')
+        mine = create_recipe(self.user, title='Lemon cake')
+
+        self.assertEqual(self.search('lemon'), [mine.id])
+
+    def test_combines_with_attr_filters(self):
+        tag = Tag.objects.create(user=self.user, name='Dessert')
+        tagged = create_recipe(self.user, title='Lemon tart')
+        tagged.tags.add(tag)
+        create_recipe(self.user, title='Lemon chicken')
+
+        self.assertEqual(
+            self.search('lemon', tags=str(tag.id)), [tagged.id])
+
+    def test_reindexed_on_update(self):
+        recipe = create_recipe(self.user, title='Plain bread')
+        self.client.patch(
+            detail_url(recipe.id), {'title': 'Garlic bread'}, format='json')
+
+        self.assertEqual(self.search('garlic'), [recipe.id])
+
+    def test_reindexed_on_relink_and_rename(self):
+        recipe = create_recipe(self.user, title='Soup')
+        tag = Tag.objects.create(user=self.user, name='Winter')
+        recipe.tags.add(tag)
+        self.assertEqual(self.search('winter'), [recipe.id])
+
+        tag.name = 'Summer'
+        tag.save()
+        self.assertEqual(self.search('winter'), [])
+        self.assertEqual(self.search('summer'), [recipe.id])
+
+        recipe.tags.remove(tag)
+        self.assertEqual(self.search('summer'), [])
+
+    def test_reindexed_on_attr_delete(self):
+        recipe = create_recipe(self.user, title='Stew')
+        ingredient = Ingredient.objects.create(user=self.user, name='Beef')
+        recipe.ingredients.add(ingredient)
+
+        ingredient.delete()
+
+        self.assertEqual(self.search('beef'), [])
+
+    def test_limit_returns_top_matches_by_rank(self):
+        in_title = [create_recipe(self.user, title=f'Apple {i}')
+                    for i in range(3)]
+        in_description = [
+            create_recipe(self.user, title=f'Pie {i}', description='apple')
+            for i in range(3)]
+
+        res = self.client.get(RECIPE_URL, {'search': 'apple', 'limit': 4})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        # Best first, not re-sorted by id like keyset pages are.
+        self.assertEqual([recipe['id'] for recipe in res.data], [
+            *[recipe.id for recipe in reversed(in_title)],
+            in_description[-1].id,
+        ])
+        self.assertEqual(len(self.search('apple')), 6)
+
+        res = self.client.get(
+            RECIPE_URL, {'search': 'apple', 'cursor': 'abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('cursor', res.data)
+
+    def test_search_uses_gin_index(self):
+        create_recipe(self.user, title='Lemon tart')
+        queryset = Recipe.objects.filter(
+            search_vector=SearchQuery('lemon', config='english'))
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+
+        self.assertIn('recipe_search_vector_idx', plan)
@@ -0,0 +1,93 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient
+)
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class SparseFieldsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Soup',
+            time_minutes=10,
+            price=Decimal('2.00'),
+            description='Hot',
+        )
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user, name='Salt')
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(self.ingredient)
+
+    def test_fields_trim_output_and_query(self):
+        with self.assertNumQueries(1) as ctx:
+            res = self.client.get(RECIPE_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [{'id': self.recipe.id, 'title': 'Soup'}])
+        recipe_sql = ctx.captured_queries[-1]['sql']
+        self.assertIn('"core_recipe"."title"', recipe_sql)
+        self.assertNotIn('"core_recipe"."price"', recipe_sql)
+
+    def test_omit_skips_prefetch(self):
+        with self.assertNumQueries(1):
+            res = self.client.get(
+                RECIPE_URL, {'omit': 'tags,ingredients'})
+
+        self.assertNotIn('tags', res.data[0])
+        self.assertEqual(res.data[0]['title'], 'Soup')
+
+    def test_expand_controls_nesting(self):
+        res = self.client.get(RECIPE_URL, {'expand': 'tags'})
+
+        self.assertEqual(
+            res.data[0]['tags'], [{'id': self.tag.id, 'name': 'Vegan'}])
+        self.assertEqual(res.data[0]['ingredients'], [self.ingredient.id])
+
+        res = self.client.get(RECIPE_URL, {'expand': ''})
+        self.assertEqual(res.data[0]['tags'], [self.tag.id])
+
+    def test_detail_fields(self):
+        res = self.client.get(
+            detail_url(self.recipe.id), {'fields': 'description'})
+
+        self.assertEqual(res.data, {'description': 'Hot'})
+
+    def test_unknown_fields_rejected(self):
+        for params in ({'fields': 'title,secret'}, {'omit': 'secret'},
+                       {'expand': 'title'}):
+            res = self.client.get(RECIPE_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_tag_fields(self):
+        res = self.client.get(TAGS_URL, {'fields': 'id'})
+
+        self.assertEqual(res.data, [{'id': self.tag.id}])
+
+    def test_writes_ignore_params(self):
+        res = self.client.patch(
+            detail_url(self.recipe.id) + '?fields=id', {'title': 'Stew'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'Stew')
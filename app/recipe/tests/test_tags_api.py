@@ -1,7 +1,9 @@
 
 from decimal import Decimal
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
@@ -72,6 +74,16 @@ class PrivateTagsApiTests(TestCase):
         tag.refresh_from_db()
         self.assertEqual(tag.name, payload['name'])
 
+    def test_update_tag_duplicate_name_error(self):
+        Tag.objects.create(user=self.user, name='Dessert')
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.patch(detail_url(tag.id), {'name': 'Dessert'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Vegan')
+
     def test_delete_tag(self):
         tag = Tag.objects.create(user=self.user, name='Vegan')
         url = detail_url(tag.id)
@@ -118,3 +130,53 @@ class PrivateTagsApiTests(TestCase):
 
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
         self.assertEqual(len(res.data), 1)
+
+    def test_update_keeps_concurrent_recipe_count(self):
+        tag = Tag.objects.create(user=self.user, name='Old')
+        Tag.objects.filter(pk=tag.pk).update(recipe_count=3)
+
+        serializer = TagSerializer(tag, data={'name': 'New'}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        tag.refresh_from_db()
+        self.assertEqual((tag.name, tag.recipe_count), ('New', 3))
+
+    def test_invalid_assigned_only_rejected(self):
+        res = self.client.get(TAGS_URL, {'assigned_only': 'x'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('assigned_only', res.data)
+
+    def test_recipe_count_on_request(self):
+        tag1 = Tag.objects.create(user=self.user, name='tag1')
+        tag2 = Tag.objects.create(user=self.user, name='tag2')
+        for i in range(2):
+            recipe = Recipe.objects.create(
+                title=f'Recipe{i}',
+                time_minutes=5,
+                price=Decimal('4.50'),
+                user=self.user
+            )
+            recipe.tags.add(tag1)
+
+        res = self.client.get(TAGS_URL)
+        self.assertNotIn('recipe_count', res.data[0])
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(
+                TAGS_URL, {'fields': 'id,name,recipe_count'})
+        self.assertFalse([
+            q for q in ctx.captured_queries
+            if 'core_recipe_tags' in q['sql']
+        ])
+        self.assertEqual(res.data, [
+            {'id': tag2.id, 'name': 'tag2', 'recipe_count': 0},
+            {'id': tag1.id, 'name': 'tag1', 'recipe_count': 2},
+        ])
+
+        res = self.client.get(TAGS_URL, {'ordering': '-recipe_count'})
+        self.assertEqual([tag['id'] for tag in res.data], [tag1.id, tag2.id])
+
+        res = self.client.get(TAGS_URL, {'ordering': 'updated_at'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -16,4 +16,11 @@ app_name = 'recipe'
 
 urlpatterns = [
     path('', include(router.urls)),
+    path(
+        'cache-stats/',
+        views.CacheStatsView.as_view(),
+        name='cache-stats'
+    ),
+    path('changes/', views.ChangesView.as_view(), name='changes'),
+    path('media/<path:name>', views.RecipeMediaView.as_view(), name='media'),
 ]
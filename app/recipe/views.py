@@ -1,3 +1,23 @@
+import mimetypes
+from itertools import islice
+from urllib.parse import quote
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    Count,
+    F,
+    Prefetch,
+    Q,
+    Value,
+)
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    StreamingHttpResponse,
+)
+from django.utils.cache import patch_cache_control
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
@@ -10,79 +30,415 @@ from rest_framework import (
     status
 )
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import (
+    IsAdminUser,
+    IsAuthenticated,
+)
+from rest_framework.views import APIView
 
 
+from core import images
+from core.authentication import CachedTokenAuthentication
 from core.models import (
+    ChangeLog,
+    ImageJob,
     Recipe,
     Tag,
     Ingredient
 )
-from recipe import serializers
+from core.storage import is_content_addressed
+from core.uploads import BoundedUploadHandler
+from recipe import (
+    bulk,
+    cache,
+    importer,
+    serializers,
+)
+from recipe.filters import (
+    KeysetOrderingFilter,
+    NameLookupFilter,
+    RecipeAttrFilter,
+    RecipeRangeFilter,
+    RecipeSearchFilter,
+)
+from recipe.mixins import (
+    CachedListMixin,
+    ConditionalGetMixin,
+    FastReadMixin,
+)
+from recipe.pagination import KeysetPagination
+from recipe.renderers import (
+    CSVRenderer,
+    NDJSONRenderer,
+)
+
+SPARSE_FIELDS_PARAMETERS = [
+    OpenApiParameter(
+        'fields',
+        OpenApiTypes.STR,
+        description='Comma separated list of fields to return'
+    ),
+    OpenApiParameter(
+        'omit',
+        OpenApiTypes.STR,
+        description='Comma separated list of fields to leave out'
+    ),
+]
+EXPAND_PARAMETER = OpenApiParameter(
+    'expand',
+    OpenApiTypes.STR,
+    description='Comma separated list of relations to return as objects; '
+                'the others are returned as lists of IDs'
+)
+RECIPE_FILTER_PARAMETERS = [
+    OpenApiParameter(
+        'tags',
+        OpenApiTypes.STR,
+        description='Comma separated list of IDs to filter'
+    ),
+    OpenApiParameter(
+        'ingredients',
+        OpenApiTypes.STR,
+        description='Comma separated list of IDs to filter'
+    ),
+    OpenApiParameter(
+        'match',
+        OpenApiTypes.STR,
+        enum=['any', 'all'],
+        description='Require any (default) or all of the given IDs'
+    ),
+    OpenApiParameter(
+        'search',
+        OpenApiTypes.STR,
+        description='Full-text search over title, description and '
+                    'tag/ingredient names; lists return the best "limit" '
+                    'matches (100 by default, at most 1000), unpaginated'
+    ),
+    OpenApiParameter(
+        'min_price',
+        OpenApiTypes.DECIMAL,
+        description='Only recipes costing at least this'
+    ),
+    OpenApiParameter(
+        'max_price',
+        OpenApiTypes.DECIMAL,
+        description='Only recipes costing at most this'
+    ),
+    OpenApiParameter(
+        'max_time',
+        OpenApiTypes.INT,
+        description='Only recipes taking at most this many minutes'
+    ),
+]
 
 
 @extend_schema_view(
     list=extend_schema(
         parameters=[
+            *RECIPE_FILTER_PARAMETERS,
             OpenApiParameter(
-                'tags',
+                'ordering',
                 OpenApiTypes.STR,
-                description='Comma separated list of IDs to filter'
-            ),
-            OpenApiParameter(
-                'ingredients',
-                OpenApiTypes.STR,
-                description='Comma separated list of IDs to filter'
+                enum=['price', '-price', 'time_minutes', '-time_minutes',
+                      'id', '-id'],
+                description='Sort key, newest first (-id) by default'
             ),
+            *SPARSE_FIELDS_PARAMETERS,
+            EXPAND_PARAMETER,
         ]
-    )
+    ),
+    retrieve=extend_schema(
+        parameters=[*SPARSE_FIELDS_PARAMETERS, EXPAND_PARAMETER]
+    ),
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+        CachedListMixin,
+        ConditionalGetMixin,
+        FastReadMixin,
+        viewsets.ModelViewSet):
     serializer_class = serializers.RecipeDetailSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    filter_backends = [
+        RecipeAttrFilter,
+        RecipeSearchFilter,
+        RecipeRangeFilter,
+        KeysetOrderingFilter,
+    ]
+    ordering_fields = ['price', 'time_minutes', 'id']
+    ordering = ['-id']
+
+    cached_actions = ('list', 'facets')
 
-    def _params_to_ints(self, qs):
-        return [int(str_id) for str_id in qs.split(',')]
+    bulk_max_operations = 1000
+    fast_read_actions = ('list', 'export')
+    export_chunk_size = 2000
+    import_chunk_size = 2000
 
     def get_queryset(self):
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
         queryset = self.queryset
-        if tags:
-            tag_id = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_id)
-        if ingredients:
-            ingredient_id = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_id)
+        # Reads load only what the (possibly trimmed) serializer renders;
+        # writes, deletes and upload_image need whole rows and no relations.
+        if self.action in self.sparse_actions:
+            queryset = self.get_sparse_queryset(queryset)
+        return queryset.filter(user=self.request.user).order_by('-id')
 
-        return queryset.filter(
-            user=self.request.user
-        ).order_by('-id').distinct()
+    def get_required_columns(self):
+        return KeysetOrderingFilter().get_ordering_columns(
+            self.request, self)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        # A searched list is the top matches; export and facets cover all.
+        if self.action == 'list' and RecipeSearchFilter.is_active(
+                self.request):
+            queryset = queryset[:RecipeSearchFilter().get_limit(
+                self.request)]
+        return queryset
+
+    def paginate_queryset(self, queryset):
+        # Keyset pages would sort search results by id instead of rank.
+        if RecipeSearchFilter.is_active(self.request):
+            if self.paginator.cursor_query_param in self.request.query_params:
+                raise ValidationError({
+                    self.paginator.cursor_query_param:
+                        'Search results are not paginated.'})
+            return None
+        return super().paginate_queryset(queryset)
 
     def get_serializer_class(self):
         if self.action == 'list':
             return serializers.RecipeSerializer
         elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
+        elif self.action == 'bulk':
+            return serializers.RecipeBulkOperationSerializer
+        elif self.action == 'import_recipes':
+            return serializers.RecipeImportSerializer
 
         return self.serializer_class
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-    @action(methods=['POST'], detail=True, url_path='upload-image')
+    @action(methods=['POST'], detail=True, url_path='upload-image',
+            parser_classes=[MultiPartParser])
     def upload_image(self, request, pk=None):
+        """Store the image and queue its variants for the image worker."""
+        request.upload_handlers = [
+            BoundedUploadHandler(max_size=settings.RECIPE_IMAGE_MAX_SIZE)]
         recipe = self.get_object()
         serializer = self.get_serializer(recipe, data=request.data)
 
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                recipe = serializer.save(image_variants={})
+                ImageJob.objects.create(recipe=recipe, image=recipe.image.name)
             return Response(serializer.data, status=status.HTTP_200_OK)
-        return Response(serializer.data, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def _validate_bulk(self, operations):
+        recipes = self.get_queryset().in_bulk(
+            [op['id'] for op in operations if op['op'] != 'create']
+        )
+        context = self.get_serializer_context()
+        seen, pending, errors = set(), [], []
+        for op in operations:
+            serializer, error = None, {}
+            if op['op'] != 'create':
+                if op['id'] not in recipes:
+                    error = {'id': 'Not found.'}
+                elif op['id'] in seen:
+                    error = {'id': 'Recipe is used by another operation.'}
+                seen.add(op['id'])
+            if not error and op['op'] != 'delete':
+                instance = recipes[op['id']] if op['op'] == 'update' else None
+                serializer = serializers.RecipeDetailSerializer(
+                    instance,
+                    data=op['data'],
+                    partial=op['op'] == 'update',
+                    context=context,
+                )
+                if not serializer.is_valid():
+                    error = {'data': serializer.errors}
+            pending.append(serializer)
+            errors.append(error)
+        return pending, errors
+
+    @staticmethod
+    def _bulk_attr_names(pending, field):
+        return list(dict.fromkeys(
+            attr['name']
+            for serializer in pending if serializer is not None
+            for attr in serializer.validated_data.get(field, [])
+        ))
+
+    @extend_schema(
+        request=serializers.RecipeBulkOperationSerializer(many=True),
+        responses=serializers.RecipeBulkResultSerializer(many=True),
+    )
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        # Checked before any item is validated.
+        if (isinstance(request.data, list)
+                and len(request.data) > self.bulk_max_operations):
+            return Response(
+                {'detail': f'At most {self.bulk_max_operations} '
+                           'operations per request.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        operations = self.get_serializer(data=request.data, many=True)
+        operations.is_valid(raise_exception=True)
+        operations = operations.validated_data
+
+        pending, errors = self._validate_bulk(operations)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            # Resolve every tag/ingredient name of the batch up front.
+            known_attrs = {
+                model: serializers.get_or_create_attrs(
+                    model, request.user, self._bulk_attr_names(pending, field)
+                )
+                for model, field in ((Tag, 'tags'),
+                                     (Ingredient, 'ingredients'))
+            }
+            writer = bulk.RecipeBulkWriter(request.user, known_attrs)
+            writer.delete([op['id'] for op in operations
+                           if op['op'] == 'delete'])
+            created = iter(writer.write(
+                [serializer.validated_data
+                 for op, serializer in zip(operations, pending)
+                 if op['op'] == 'create'],
+                [(serializer.instance, serializer.validated_data)
+                 for op, serializer in zip(operations, pending)
+                 if op['op'] == 'update'],
+            ))
+
+        results = []
+        for op in operations:
+            if op['op'] == 'delete':
+                results.append({'op': 'delete', 'id': op['id'],
+                                'status': status.HTTP_204_NO_CONTENT})
+            elif op['op'] == 'create':
+                results.append({'op': 'create', 'id': next(created).id,
+                                'status': status.HTTP_201_CREATED})
+            else:
+                results.append({'op': 'update', 'id': op['id'],
+                                'status': status.HTTP_200_OK})
+        return Response(results, status=status.HTTP_200_OK)
+
+    def get_facet_counts(self):
+        """Recipe counts per tag and per ingredient over the filtered
+        recipes, from one GROUP BY per through table sent as one query."""
+        recipe_ids = self.filter_queryset(self.get_queryset()).values('id')
+        counts = [
+            getattr(Recipe, key).through.objects
+            .filter(recipe_id__in=recipe_ids)
+            .values(
+                facet=Value(key),
+                attr_id=F(f'{field}_id'),
+                name=F(f'{field}__name'),
+            )
+            .annotate(count=Count('recipe_id'))
+            for key, field in (('tags', 'tag'),
+                               ('ingredients', 'ingredient'))
+        ]
+        facets = {'tags': [], 'ingredients': []}
+        for row in counts[0].union(counts[1], all=True).order_by(
+                'facet', '-count', 'name'):
+            facets[row['facet']].append(
+                {'id': row['attr_id'], 'name': row['name'],
+                 'count': row['count']})
+        return facets
+
+    def _facets(self, request):
+        return Response(self.get_facet_counts())
+
+    @extend_schema(
+        parameters=RECIPE_FILTER_PARAMETERS,
+        responses=serializers.RecipeFacetsSerializer,
+    )
+    @action(methods=['GET'], detail=False, url_path='facets')
+    def facets(self, request):
+        """How many of the recipes matching the filters carry each tag and
+        ingredient, for filter sidebars."""
+        return self.get_cached_response(self._facets, request)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'format',
+                OpenApiTypes.STR,
+                enum=['ndjson', 'csv'],
+                description='Export format, ndjson by default'
+            ),
+        ],
+        responses={(200, 'application/x-ndjson'): OpenApiTypes.STR,
+                   (200, 'text/csv'): OpenApiTypes.STR},
+    )
+    @action(methods=['GET'], detail=False, url_path='export',
+            renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """Stream every recipe of the user, oldest first."""
+        renderer = request.accepted_renderer
+        fields = list(self.get_serializer().fields)
+        rows = self.get_serializer().get_values_queryset(
+            self.filter_queryset(self.get_queryset())
+        ).order_by('id').iterator(chunk_size=self.export_chunk_size)
+
+        def stream():
+            yield renderer.render([], renderer_context={'fields': fields})
+            while True:
+                chunk = list(islice(rows, self.export_chunk_size))
+                if not chunk:
+                    break
+                yield renderer.render(
+                    self.get_serializer(chunk, many=True).data,
+                    renderer_context={'fields': fields, 'header': False},
+                )
+
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        response = StreamingHttpResponse(stream(), content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{renderer.format}"')
+        return response
+
+    @extend_schema(
+        request={'multipart/form-data': serializers.RecipeImportSerializer},
+        responses={201: serializers.RecipeImportResultSerializer},
+    )
+    @action(methods=['POST'], detail=False, url_path='import',
+            parser_classes=[MultiPartParser])
+    def import_recipes(self, request):
+        """Create recipes from an uploaded NDJSON or CSV file in the export
+        layout. All rows are imported or, on the first invalid row, none."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.validated_data['file']
+        file_format = serializer.validated_data.get('format') or (
+            'csv' if upload.name.lower().endswith('.csv') else 'ndjson')
+
+        recipe_importer = importer.RecipeImporter(
+            request.user, chunk_size=self.import_chunk_size)
+        try:
+            created = recipe_importer.run(
+                importer.PARSERS[file_format](upload))
+        except importer.RecipeImportError as exc:
+            return Response(
+                {'line': exc.line, 'errors': exc.errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response({'created': created}, status=status.HTTP_201_CREATED)
 
 
 @extend_schema_view(
@@ -94,35 +450,221 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 enum=[0, 1],
                 description='filter by items assigned to recipes'
             ),
+            OpenApiParameter(
+                'prefix',
+                OpenApiTypes.STR,
+                description='Autocomplete: names starting with this, '
+                            'case-insensitively'
+            ),
+            OpenApiParameter(
+                'q',
+                OpenApiTypes.STR,
+                description='Autocomplete: names similar to this, '
+                            'best match first'
+            ),
+            OpenApiParameter(
+                'limit',
+                OpenApiTypes.INT,
+                description='Page size, or with prefix/q the number of '
+                            'matches to return (default 10, at most 50)'
+            ),
+            *SPARSE_FIELDS_PARAMETERS,
+            # Replaces the generic description of SPARSE_FIELDS_PARAMETERS.
+            OpenApiParameter(
+                'fields',
+                OpenApiTypes.STR,
+                description='Comma separated list of fields to return; '
+                            'name recipe_count to get the number of '
+                            'recipes using each item'
+            ),
+            OpenApiParameter(
+                'ordering',
+                OpenApiTypes.STR,
+                enum=['name', '-name', 'recipe_count', '-recipe_count',
+                      'id', '-id'],
+                description='Sort key, by name descending by default'
+            ),
         ]
     )
 )
 class BaseRecipeAttrViewSet(
+        CachedListMixin,
+        ConditionalGetMixin,
+        FastReadMixin,
         mixins.DestroyModelMixin,
         mixins.UpdateModelMixin,
         mixins.ListModelMixin,
         viewsets.GenericViewSet):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    # Autocomplete ranks its matches itself, so it goes last.
+    filter_backends = [KeysetOrderingFilter, NameLookupFilter]
+    ordering_fields = ['name', 'recipe_count', 'id']
+    ordering = ['-id']
+
+    def paginate_queryset(self, queryset):
+        # Autocomplete returns its own top-N, ranked rather than by id.
+        if NameLookupFilter.is_active(self.request):
+            return None
+        return super().paginate_queryset(queryset)
 
     def get_queryset(self):
-        assigned_only = bool(
-            int(self.request.query_params.get('assigned_only', 0))
-        )
+        assigned_only = self.request.query_params.get('assigned_only', '0')
+        if assigned_only not in ('0', '1'):
+            raise ValidationError({'assigned_only': 'Expected 0 or 1.'})
         queryset = self.queryset
-        if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+        if self.action in self.sparse_actions:
+            queryset = self.get_sparse_queryset(queryset)
+        if assigned_only == '1':
+            queryset = queryset.filter(recipe_count__gt=0)
+
+        return queryset.filter(user=self.request.user).order_by('-name')
 
-        return queryset.filter(
-            user=self.request.user
-        ).order_by('-name').distinct()
+    def get_required_columns(self):
+        return KeysetOrderingFilter().get_ordering_columns(
+            self.request, self)
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
     serializer_class = serializers.TagSerializer
     queryset = Tag.objects.all()
+    recipe_field = 'tags'
 
 
 class IngredientViewSet(BaseRecipeAttrViewSet):
     serializer_class = serializers.IngredientSerializer
     queryset = Ingredient.objects.all()
+    recipe_field = 'ingredients'
+
+
+class CacheStatsView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(responses=serializers.CacheStatsSerializer)
+    def get(self, request):
+        return Response(cache.get_stats())
+
+
+@extend_schema_view(
+    get=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'since',
+                OpenApiTypes.STR,
+                description='Token returned as `next` by the previous call; '
+                            'omit to sync from the beginning'
+            ),
+            OpenApiParameter(
+                'limit',
+                OpenApiTypes.INT,
+                description='Maximum number of log entries to consume'
+            ),
+        ],
+        responses=serializers.ChangesSerializer,
+    )
+)
+class ChangesView(APIView):
+    """What changed in the user's collections since a sync token."""
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    default_limit = 500
+    max_limit = 1000
+    # Response key, model and the queryset the upserted objects come from.
+    collections = (
+        ('recipes', Recipe, Recipe.objects.prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.only('id', 'name')),
+            Prefetch(
+                'ingredients', queryset=Ingredient.objects.only('id', 'name')
+            ),
+        )),
+        ('tags', Tag, Tag.objects.all()),
+        ('ingredients', Ingredient, Ingredient.objects.all()),
+    )
+
+    def _int_param(self, name, default):
+        try:
+            value = int(self.request.query_params.get(name, default))
+        except ValueError:
+            value = -1
+        if value < 0:
+            raise ValidationError({name: 'Expected a non-negative integer.'})
+        return value
+
+    def get(self, request):
+        since = self._int_param('since', 0)
+        limit = min(
+            self._int_param('limit', self.default_limit) or 1,
+            self.max_limit,
+        )
+        entries = list(
+            ChangeLog.objects.filter(user=request.user, id__gt=since)
+            .order_by('id')
+            .values_list('id', 'object_type', 'object_id', 'action')
+            [:limit + 1]
+        )
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+
+        # Only the last action of each object matters.
+        last_change = {}
+        for _, object_type, object_id, change in entries:
+            last_change[object_type, object_id] = change
+        changed = {}
+        for (object_type, object_id), change in last_change.items():
+            changed.setdefault((object_type, change), []).append(object_id)
+
+        result = {}
+        for key, model, queryset in self.collections:
+            object_type = model._meta.model_name
+            upserted = changed.get((object_type, ChangeLog.UPSERT), [])
+            found = queryset.filter(user=request.user).in_bulk(upserted)
+            result[key] = {
+                'upserted': [found[pk] for pk in sorted(found)],
+                # An upsert whose row is gone was deleted after the entries
+                # read here; reporting it now saves the client a round trip.
+                'deleted': sorted(
+                    changed.get((object_type, ChangeLog.DELETE), [])
+                    + [pk for pk in upserted if pk not in found]
+                ),
+            }
+        result['next'] = str(entries[-1][0] if entries else since)
+        result['has_more'] = has_more
+
+        return Response(serializers.ChangesSerializer(
+            result, context={'request': request}).data)
+
+
+class RecipeMediaView(APIView):
+    """Authorize a recipe image download and hand it to the proxy."""
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    immutable_max_age = 365 * 24 * 60 * 60
+
+    @extend_schema(responses={200: OpenApiTypes.BINARY})
+    def get(self, request, name):
+        used_by = Q(image=name)
+        for variant, _ in images.VARIANTS:
+            for ext, _, _ in images.FORMATS:
+                used_by |= Q(**{f'image_variants__{variant}__{ext}': name})
+        if not Recipe.objects.filter(used_by, user=request.user).exists():
+            raise Http404
+
+        content_type = (mimetypes.guess_type(name)[0]
+                        or 'application/octet-stream')
+        if settings.MEDIA_ACCEL_REDIRECT:
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = (
+                settings.MEDIA_ACCEL_REDIRECT_URL + quote(name))
+        else:
+            storage = Recipe._meta.get_field('image').storage
+            response = FileResponse(
+                storage.open(name), content_type=content_type)
+        if is_content_addressed(name):
+            patch_cache_control(
+                response, private=True, max_age=self.immutable_max_age,
+                immutable=True)
+        else:
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
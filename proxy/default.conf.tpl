@@ -1,14 +1,31 @@
 server {
     listen ${LISTEN_PORT};
 
+    # Media is private: the app authorizes each request under
+    # /api/recipe/media/ and hands the file over via X-Accel-Redirect.
+    location /static/media {
+        return 404;
+    }
+
     location /static {
         alias /vol/static;
     }
 
+    location /protected-media/ {
+        internal;
+        alias /vol/static/media/;
+        # Zero-copy delivery; Range requests are answered from the file.
+        sendfile on;
+        tcp_nopush on;
+        sendfile_max_chunk 1m;
+        # Cache-Control comes from the app: immutable for content-hashed
+        # names.
+        etag on;
+    }
+
     location / {
         uwsgi_pass ${APP_HOST}:${APP_PORT};
         include    /etc/nginx/uwsgi_params;
         client_max_body_size 10M;
     }
 }
-